@@ -4,11 +4,12 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from .core.config import settings
-from .routers import locations, schedule, planner, oauth, calendar as cal_router
+from .routers import locations, schedule, planner, travel, oauth, calendar as cal_router
 from .routers.auth_router import router as auth_router
 from .agent import router as agent_router
 from .routers.multiagents_router import router as multi_router
 from .routers.react_router import router as react_router
+from .services.solver_pool import shutdown_pool
 # Weaviate / VectorStore
 import weaviate
 from langchain_openai import OpenAIEmbeddings
@@ -41,6 +42,7 @@ async def lifespan(app: FastAPI):
         app.state.weaviate_client.close()
         app.state.weaviate_client = None
     app.state.vectorstore = None
+    shutdown_pool()
 
 def create_app() -> FastAPI:
     app = FastAPI(title="NUS Smart Scheduler", version="0.1.0", lifespan=lifespan)
@@ -57,6 +59,7 @@ def create_app() -> FastAPI:
     app.include_router(locations.router, prefix="/api", tags=["locations"])
     app.include_router(schedule.router,  prefix="/api", tags=["schedule"])
     app.include_router(planner.router,   prefix="/api", tags=["planner"])
+    app.include_router(travel.router,    prefix="/api", tags=["travel"])
     app.include_router(oauth.router,                 tags=["auth"])
     app.include_router(cal_router.router,            tags=["calendar"])
     app.include_router(agent_router.router, prefix="/agent", tags=["agent"])
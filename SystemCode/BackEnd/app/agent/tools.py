@@ -1,6 +1,7 @@
 # app/agent/tools.py
+from typing import List
 from langchain_core.tools import tool
-from app.services.travel_graph import load_travel_graph, travel_slots
+from app.services.travel_graph import load_travel_graph, travel_slots, eta_matrix as _eta_matrix
 
 @tool
 def eta_slots(loc_from: str, loc_to: str, mode: str="auto") -> int:
@@ -8,3 +9,10 @@ def eta_slots(loc_from: str, loc_to: str, mode: str="auto") -> int:
     G = load_travel_graph(mode)
     return travel_slots(G, loc_from, loc_to)
 
+@tool
+def eta_matrix(locations: List[str], mode: str="auto") -> dict:
+    """Return travel slots and minutes between every pair of the given locations in one call:
+    {"locations": [...], "slots": [[...]], "minutes": [[...]]}; slots[i][j] is from locations[i] to locations[j]."""
+    G = load_travel_graph(mode)
+    return _eta_matrix(G, locations)
+
@@ -26,6 +26,36 @@ class Settings(BaseSettings):
     AGENT_ENABLE_TOOLS: bool = Field(True, env="AGENT_ENABLE_TOOLS")
     AGENT_ENABLE_RAG: bool = Field(False, env="AGENT_ENABLE_RAG")
     RAG_INDEX_DIR: str | None = Field(None, env="RAG_INDEX_DIR")
+    # 预计算出行矩阵快照目录（多 worker 共享 mmap；为空则直接查库）
+    TRAVEL_SNAPSHOT_DIR: str | None = Field(None, env="TRAVEL_SNAPSHOT_DIR")
+    # travel_times 版本指纹的复用时长（秒）
+    TRAVEL_VERSION_TTL: float = Field(5.0, env="TRAVEL_VERSION_TTL")
+    # /api/generate 每个模式的 hybrid 局部搜索时间上限（秒；搜索停滞时提前结束）
+    GENERATE_TIME_BUDGET: float = Field(0.15, env="GENERATE_TIME_BUDGET")
+    # 求解进程池大小（为空则取 CPU 核数）
+    SOLVER_POOL_WORKERS: int | None = Field(None, env="SOLVER_POOL_WORKERS")
+    # /api/generate 每个模式的 hybrid 多起点数量（1 = 单进程，不启用进程池）
+    GENERATE_RESTARTS: int = Field(1, env="GENERATE_RESTARTS")
+    # /api/generate 用 CP 引擎时三个模式并行求解（共享同一模型与核数配额）
+    GENERATE_PARALLEL_MODES: bool = Field(True, env="GENERATE_PARALLEL_MODES")
+    # 求解前按时间窗/通勤把任务拆成互不影响的分量分别（并行）求解
+    SOLVER_DECOMPOSE: bool = Field(True, env="SOLVER_DECOMPOSE")
+    # 求解结果缓存条数（LRU，0 = 关闭）与有效期（秒）
+    PLAN_CACHE_SIZE: int = Field(256, env="PLAN_CACHE_SIZE")
+    PLAN_CACHE_TTL: float = Field(600.0, env="PLAN_CACHE_TTL")
+    # 增量重排：改动附近需重新求解的范围（分钟）与时间预算（秒）
+    REPLAN_RADIUS_MIN: int = Field(60, env="REPLAN_RADIUS_MIN")
+    REPLAN_TIME_BUDGET: float = Field(0.08, env="REPLAN_TIME_BUDGET")
+    # CP-SAT 默认时间上限（秒）
+    CP_TIME_LIMIT: float = Field(5.0, env="CP_TIME_LIMIT")
+    # 客户端 timeLimit 的服务器端上限（秒）
+    CP_MAX_TIME_LIMIT: float = Field(30.0, env="CP_MAX_TIME_LIMIT")
+    # 单次 CP-SAT 求解默认 worker 数（并行模式/分量之间再按配额平分）
+    CP_WORKERS: int = Field(8, env="CP_WORKERS")
+    # 全服务器 CP-SAT worker 核数配额（为空则取 CPU 核数）
+    CP_CORE_QUOTA: int | None = Field(None, env="CP_CORE_QUOTA")
+    # CP-SAT 相对 gap 提前停止（0 = 求到最优或超时）
+    CP_RELATIVE_GAP: float = Field(0.0, env="CP_RELATIVE_GAP")
     # pydantic v2 配置方式
     model_config = SettingsConfigDict(
         env_file=".env",
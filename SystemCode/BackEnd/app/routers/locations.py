@@ -1,21 +1,25 @@
-from fastapi import APIRouter
-from sqlalchemy import text
-from ..db.session import get_engine
+import hashlib
+import json
+
+from fastapi import APIRouter, Request, Response
+from ..services.travel_graph import load_travel_graph
 
 
 router = APIRouter()
 
 
 @router.get("/locations")
-def get_locations():
-    eng = get_engine()
-    sql = text(
-        """
-        SELECT DISTINCT loc_from AS loc FROM travel_times
-        UNION
-        SELECT DISTINCT loc_to FROM travel_times
-        """
-    )
-    with eng.begin() as conn:
-        rows = conn.execute(sql).fetchall()
-    return {"locations": [r[0] for r in rows]}
\ No newline at end of file
+def get_locations(request: Request, response: Response):
+    # Served from the cached travel matrix index.  The ETag hashes the list
+    # itself: G.version carries a per-process reload counter, so it would
+    # differ between workers serving the same data.
+    G = load_travel_graph("auto")
+    locations = sorted(G.nodes)
+    digest = hashlib.sha1(json.dumps(locations, ensure_ascii=False).encode("utf-8")).hexdigest()[:16]
+    etag = f'W/"{digest}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    client_tags = [t.strip() for t in request.headers.get("if-none-match", "").split(",")]
+    if etag in client_tags or "*" in client_tags:
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return {"locations": locations}
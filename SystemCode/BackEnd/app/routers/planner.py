@@ -1,61 +1,106 @@
+import json
+
 from fastapi import APIRouter, HTTPException
-from ..schemas.tasks import GenerateReq
-from ..services.travel_graph import load_travel_graph, travel_slots
-from ..services.scheduler import solve_plan
+from fastapi.responses import StreamingResponse
+from ..schemas.tasks import GenerateReq, ReplanReq
+from ..services.travel_graph import load_travel_graph, route_legs
+from ..services.scheduler import PlanningSession, repair_plan, solve_plan
+from ..services.plan_cache import plan_cache, plan_key
+from ..core.config import settings
 from ..core.constants import SLOT_MIN
 
 
 router = APIRouter()
 
 
-@router.post("/generate")
-def api_generate(req: GenerateReq):
-    print(req)
+MODES = [
+    ("Travel-first", "Minimize inter-location travel", "indigo", "travel"),
+    ("Preference-first", "Maximize preferred windows", "emerald", "preference"),
+    ("Compact-day", "Minimize makespan", "sky", "compact"),
+]
+
+
+def _check_and_load(req):
     if not req.tasks:
         raise HTTPException(400, "No tasks provided.")
     for t in req.tasks:
         if t.earliest > t.latest:
             raise HTTPException(400, f"Earliest must be <= Latest for task '{t.title}'")
 
-
     cm = (req.commuteMode or "bus").lower()
     if cm == "transit":
         cm = "bus"
-    G = load_travel_graph(cm)
-
-
-    modes = [
-        ("Travel-first", "Minimize inter-location travel", "indigo", "travel"),
-        ("Preference-first", "Maximize preferred windows", "emerald", "preference"),
-        ("Compact-day", "Minimize makespan", "sky", "compact"),
+    return load_travel_graph(cm)
+
+
+def _timeline(G, items, color):
+    """Timeline rows for one plan plus its total travel minutes."""
+    legs = route_legs(G, [it["loc"] for it in items])
+    total_travel_min = sum(leg["slots"] for leg in legs) * SLOT_MIN
+    timeline = [
+        {
+            "id": it["id"],
+            "title": it["title"],
+            "loc": it["loc"],
+            "start": it["start"],
+            "end": it["end"],
+            "travel": f"{total_travel_min}′" if len(items) > 1 else "—",
+            # leg arriving at this item: "walk" | "bus" | "mixed", and its stops
+            "travel_mode": legs[i - 1]["mode"] if i > 0 else None,
+            "route": legs[i - 1]["stops"] if i > 0 else [],
+            "color": color,
+        }
+        for i, it in enumerate(items)
     ]
+    return timeline, total_travel_min
 
 
-    plans, all_timelines = [], []
+@router.post("/generate")
+def api_generate(req: GenerateReq):
+    print(req)
+    G = _check_and_load(req)
+    modes = MODES
+
+
+    engine = req.engine or "hybrid"
+    if engine == "cp":
+        # one CP model for all three modes; only the objective changes
+        mode_keys = [m[3] for m in modes]
+        options = dict(
+            cp_formulation=req.cpModel or "pairwise", warm_start=req.warmStart,
+            parallel=settings.GENERATE_PARALLEL_MODES,
+            time_budget=req.timeLimit, workers=req.workers, relative_gap=req.relativeGap,
+        )
+
+        def solve_modes():
+            session = PlanningSession(G, req.tasks, options["cp_formulation"], warm_start=req.warmStart)
+            return session.solve_all(
+                mode_keys, parallel=options["parallel"],
+                time_budget=req.timeLimit, workers=req.workers, relative_gap=req.relativeGap,
+            )
+
+        if plan_cache.enabled:
+            key = plan_key(G, req.tasks, mode=",".join(mode_keys), engine=engine, **options)
+            results = plan_cache.get_or_solve(key, solve_modes)
+        else:
+            results = solve_modes()
+    else:
+        results = [
+            solve_plan(
+                G, req.tasks, mode=mode_key, engine=engine,
+                time_budget=settings.GENERATE_TIME_BUDGET, restarts=settings.GENERATE_RESTARTS,
+            )
+            for _, _, _, mode_key in modes
+        ]
 
 
-    for idx, (title, desc, color, mode_key) in enumerate(modes):
-        items = solve_plan(G, req.tasks, mode=mode_key, engine="hybrid")
+    plans, all_timelines = [], []
 
 
-        total_travel_slots = 0
-        for i in range(len(items) - 1):
-            a, b = items[i]["loc"], items[i + 1]["loc"]
-            total_travel_slots += travel_slots(G, a, b)
-        total_travel_min = total_travel_slots * SLOT_MIN
+    for idx, ((title, desc, color, mode_key), items) in enumerate(zip(modes, results)):
 
 
-        timeline = [
-            {
-                "title": it["title"],
-                "loc": it["loc"],
-                "start": it["start"],
-                "end": it["end"],
-                "travel": f"{total_travel_min}′" if len(items) > 1 else "—",
-                "color": color,
-            }
-            for it in items
-        ]
+        timeline, total_travel_min = _timeline(G, items, color)
 
 
         plans.append({
@@ -66,4 +111,68 @@ def api_generate(req: GenerateReq):
         })
         all_timelines.append(timeline)
         print({"ok": True, "plans": plans, "all_timelines": all_timelines})
-    return {"ok": True, "plans": plans, "all_timelines": all_timelines}
\ No newline at end of file
+    return {"ok": True, "plans": plans, "all_timelines": all_timelines}
+
+
+@router.post("/generate/stream")
+def api_generate_stream(req: GenerateReq, format: str = "sse"):
+    """Stream the three plans while CP-SAT improves them.
+
+    Always uses the CP engine.  Every improving schedule is pushed as a
+    ``solution`` event (mode, objective, bound, elapsed seconds, timeline),
+    each mode ends with a ``final`` event and the stream with ``done``.
+    ``format=sse`` (default) sends ``text/event-stream`` frames,
+    ``format=ndjson`` one JSON object per line.
+    """
+    G = _check_and_load(req)
+    session = PlanningSession(G, req.tasks, req.cpModel or "pairwise", warm_start=req.warmStart)
+    by_key = {m[3]: m for m in MODES}
+
+    def events():
+        for ev in session.stream(
+            [m[3] for m in MODES], parallel=settings.GENERATE_PARALLEL_MODES,
+            time_budget=req.timeLimit, workers=req.workers, relative_gap=req.relativeGap,
+        ):
+            if "items" in ev:
+                title, _, color, _ = by_key[ev["mode"]]
+                items = ev.pop("items")
+                timeline, total_travel_min = _timeline(G, items, color)
+                ev.update(title=title, meta=f"{len(items)} tasks · {total_travel_min}′ travel", timeline=timeline)
+            yield ev
+        yield {"event": "done"}
+
+    if format == "ndjson":
+        body = (json.dumps(ev, ensure_ascii=False) + "\n" for ev in events())
+        return StreamingResponse(body, media_type="application/x-ndjson")
+    body = (f"event: {ev['event']}\ndata: {json.dumps(ev, ensure_ascii=False)}\n\n" for ev in events())
+    return StreamingResponse(body, media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@router.post("/replan")
+def api_replan(req: ReplanReq):
+    """Repair one plan after an edit (task added, removed or moved) instead
+    of regenerating all three; see :func:`repair_plan`."""
+    removed = set(req.removed)
+    edits = {t.id: t for t in [*req.added, *req.moved]}
+    tasks = [edits.pop(t.id, t) for t in req.tasks if t.id not in removed]
+    tasks += [t for t in edits.values() if t.id not in removed]
+    changed = [t.id for t in [*req.added, *req.moved] if t.id not in removed]
+    G = _check_and_load(req.model_copy(update={"tasks": tasks}))
+
+    by_key = {m[3]: m for m in MODES}
+    title, _, color, mode_key = by_key.get(req.mode, MODES[0])
+    items, repaired = repair_plan(
+        G, tasks, [it.model_dump() for it in req.previous], changed, mode=mode_key,
+        engine=req.engine or "hybrid", cp_formulation=req.cpModel or "pairwise", time_budget=req.timeLimit,
+    )
+    timeline, total_travel_min = _timeline(G, items, color)
+    return {
+        "ok": True,
+        "tasks": [t.model_dump() for t in tasks],
+        "plan": {"title": title, "meta": f"{len(items)} tasks · {total_travel_min}′ travel"},
+        "items": items,
+        "timeline": timeline,
+        # False: the edit could not be repaired in time and a fallback plan
+        # (previous plan, or a fresh one) was returned instead
+        "repaired": repaired,
+    }
@@ -0,0 +1,41 @@
+from fastapi import APIRouter, HTTPException
+from ..core.config import settings
+from ..schemas.travel import EtaMatrixReq, RouteReq
+from ..services.travel_graph import (
+    eta_matrix,
+    export_travel_snapshot,
+    invalidate_travel_cache,
+    load_travel_graph,
+    route_legs,
+    travel_version,
+)
+
+
+router = APIRouter()
+
+
+@router.post("/travel/reload")
+def reload_travel():
+    invalidate_travel_cache()
+    return {"ok": True, "version": travel_version()}
+
+
+@router.post("/travel/snapshot")
+def export_snapshot():
+    if not settings.TRAVEL_SNAPSHOT_DIR:
+        raise HTTPException(400, "TRAVEL_SNAPSHOT_DIR is not configured.")
+    version = export_travel_snapshot(settings.TRAVEL_SNAPSHOT_DIR)
+    invalidate_travel_cache()
+    return {"ok": True, "version": version}
+
+
+@router.post("/travel/routes")
+def get_routes(req: RouteReq):
+    G = load_travel_graph((req.commuteMode or "auto").lower())
+    return {"version": G.version, "legs": route_legs(G, req.locations)}
+
+
+@router.post("/travel/eta-matrix")
+def get_eta_matrix(req: EtaMatrixReq):
+    G = load_travel_graph((req.commuteMode or "auto").lower())
+    return {"version": G.version, **eta_matrix(G, req.locations)}
@@ -45,4 +45,36 @@ class TaskIn(BaseModel):
         return [[_hhmm_from_any(a), _hhmm_from_any(b)] for a, b in v]
 class GenerateReq(BaseModel):
     tasks: List[TaskIn]
-    commuteMode: Optional[str] = "auto"
\ No newline at end of file
+    commuteMode: Optional[str] = "auto"
+    engine: Optional[str] = "hybrid"  # "hybrid" | "cp"
+    cpModel: Optional[str] = "pairwise"  # engine="cp" only: "pairwise" | "circuit"
+    # engine="cp" only: solver limits (None = server defaults) and hybrid warm start
+    timeLimit: Optional[float] = None
+    workers: Optional[int] = None
+    relativeGap: Optional[float] = None
+    warmStart: bool = False
+
+
+class PlanItem(BaseModel):
+    id: str
+    start: str  # "HH:MM"
+    end: str  # "HH:MM"
+
+    @field_validator("start", "end", mode="before")
+    @classmethod
+    def _normalize_time(cls, v: str) -> str:
+        return _hhmm_from_any(v)
+
+
+class ReplanReq(BaseModel):
+    tasks: List[TaskIn]  # task list `previous` was planned from
+    previous: List[PlanItem]
+    # the edit: new tasks, removed ids, and new definitions of existing tasks
+    added: List[TaskIn] = []
+    removed: List[str] = []
+    moved: List[TaskIn] = []
+    mode: str = "travel"  # "travel" | "preference" | "compact"
+    commuteMode: Optional[str] = "auto"
+    engine: Optional[str] = "hybrid"  # "hybrid" | "cp"
+    cpModel: Optional[str] = "pairwise"
+    timeLimit: Optional[float] = None
@@ -0,0 +1,12 @@
+from typing import List, Optional
+from pydantic import BaseModel
+
+
+class RouteReq(BaseModel):
+    locations: List[str]  # in visiting order, e.g. the locs of a returned schedule
+    commuteMode: Optional[str] = "auto"
+
+
+class EtaMatrixReq(BaseModel):
+    locations: List[str]
+    commuteMode: Optional[str] = "auto"
@@ -2,13 +2,35 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from typing import List, Dict, Tuple, Optional, Callable
+from array import array
+import bisect
+import math
 import random
+import time
+
+import numpy as np
 
 from ..schemas.tasks import TaskIn
 from ..utils.timeutils import to_slot, slot_to_hhmm
 from ..core.constants import DAY_START, DAY_END, SLOT_MIN
 
-@dataclass
+# Objective penalty for a task left out of the schedule.  One insertion
+# changes travel by at most two legs and the makespan by at most a day, so
+# covering a task always beats any travel/makespan it costs; a fixed task
+# outweighs any number of optional ones.
+DROP_COST = 1000
+FIXED_DROP_COST = 10 * DROP_COST
+
+# Annealing stops early after this many iterations per task (at least
+# STALL_MIN) without a new best schedule.
+STALL_PER_TASK = 100
+STALL_MIN = 1000
+
+# Local-search move kinds (for undo) and shift offsets.
+_NONE, _MOVE, _SWAP, _RESTORE = 0, 1, 2, 3
+_SHIFTS = (-3, -2, -1, 1, 2, 3)
+
+@dataclass(slots=True)
 class _LiteTask:
     id: str
     title: str
@@ -20,7 +42,7 @@ class _LiteTask:
     prefer_win: Optional[List[Tuple[int, int]]]
 
 
-@dataclass
+@dataclass(slots=True)
 class _Placed:
     id: str
     title: str
@@ -29,152 +51,751 @@ class _Placed:
     end: int
 
 
+def _start_of(p: _Placed) -> int:
+    return p.start
+
+
+class _SlotMasks:
+    """Slot-occupancy model for greedy construction.
+
+    Placements are kept as parallel start/end/location arrays and travel as
+    a ``[from, to, departure slot]`` table over the instance's locations,
+    so :meth:`feasible_starts` tests every candidate start of a task
+    against every placement in one broadcast instead of one
+    ``_feasible_insert`` call per slot.
+    """
+
+    def __init__(self, tasks: List[_LiteTask], H: int, travel: np.ndarray) -> None:
+        """``travel`` is indexed by the sorted distinct locations of ``tasks``."""
+        locs = sorted({t.loc for t in tasks})
+        self.H = H
+        self.loc_ix = {loc: i for i, loc in enumerate(locs)}
+        self.travel = travel
+        self.p_loc: List[int] = []
+        self.p_start: List[int] = []
+        self.p_end: List[int] = []
+
+    def feasible_starts(self, task: _LiteTask) -> np.ndarray:
+        """Every start slot at which ``task`` fits, ascending."""
+        lo, hi = task.window[0], min(task.window[1], self.H - task.duration)
+        if lo > hi:
+            return np.empty(0, dtype=np.int64)
+        starts = np.arange(lo, hi + 1)
+        if not self.p_loc:
+            return starts
+        a = self.loc_ix[task.loc]
+        p_loc = np.array(self.p_loc)
+        p_start = np.array(self.p_start)
+        p_end = np.array(self.p_end)
+        ends = starts + task.duration
+        # task first: it must finish and travel before the placement starts
+        fits_before = ends[None, :] + self.travel[a][p_loc][:, ends] <= p_start[:, None]
+        # placement first: the task may start once we have travelled over
+        ready = p_end + self.travel[p_loc, a, np.minimum(p_end, self.H)]
+        fits_after = starts[None, :] >= ready[:, None]
+        return starts[(fits_before | fits_after).all(axis=0)]
+
+    def place(self, p: _Placed) -> None:
+        self.p_loc.append(self.loc_ix[p.loc])
+        self.p_start.append(p.start)
+        self.p_end.append(p.end)
+
+
+class _State:
+    """Array-backed schedule that local search mutates in place.
+
+    Tasks are numbered ``0..n-1``: ``start[t]`` is the start slot of task
+    ``t`` (``-1`` while unscheduled) and ``order`` lists the scheduled task
+    numbers sorted by start.  Durations, windows and location indexes are
+    parallel arrays and travel is a nested-list copy of the ``[from, to,
+    departure slot]`` table, so a move rewrites a few ints and never builds
+    placement objects.
+    """
+
+    __slots__ = (
+        "H", "mode", "order", "start", "dur", "loc", "lo", "hi", "prio", "drop", "pref", "tt", "key",
+        "travel", "pen", "np_dur", "np_loc", "np_lo", "np_hi",
+    )
+
+    def __init__(
+        self, tasks: List[_LiteTask], H: int, mode: str, loc_ix: Dict[str, int], travel: np.ndarray
+    ) -> None:
+        self.H = H
+        self.mode = mode
+        self.order: List[int] = []
+        self.start = array("i", [-1] * len(tasks))
+        self.dur = array("i", [t.duration for t in tasks])
+        self.loc = array("i", [loc_ix[t.loc] for t in tasks])
+        self.lo = array("i", [t.window[0] for t in tasks])
+        self.hi = array("i", [min(t.window[1], H - t.duration) for t in tasks])
+        self.prio = array("i", [t.priority for t in tasks])
+        self.drop = array("i", [FIXED_DROP_COST if t.fixed else DROP_COST for t in tasks])
+        self.pref = [t.prefer_win if mode == "preference" else None for t in tasks]
+        self.tt: List[List[List[int]]] = travel.tolist()
+        self.key = self.start.__getitem__
+        # NumPy views for batch move evaluation (:meth:`shift_moves`,
+        # :meth:`swap_moves`); ``pen[t, s]`` is the preference cost of
+        # starting task ``t`` at slot ``s``.
+        self.travel = travel
+        self.np_dur = np.asarray(self.dur, dtype=np.int64)
+        self.np_loc = np.asarray(self.loc, dtype=np.int64)
+        self.np_lo = np.asarray(self.lo, dtype=np.int64)
+        self.np_hi = np.asarray(self.hi, dtype=np.int64)
+        self.pen = np.zeros((len(tasks), H + 1), dtype=np.int64)
+        for t, wins in enumerate(self.pref):
+            if wins:
+                self.pen[t] = 10
+                for a, b in wins:
+                    self.pen[t, max(0, a): min(H, b) + 1] = 0
+
+    def place(self, t: int, s: int) -> None:
+        self.start[t] = s
+        self.order.insert(bisect.bisect_left(self.order, s, key=self.key), t)
+
+    def fits(self, t: int, s: int) -> bool:
+        """Can task ``t`` (not in ``order``) start at ``s``?"""
+        if s < self.lo[t] or s > self.hi[t]:
+            return False
+        order, start, dur, loc, tt = self.order, self.start, self.dur, self.loc, self.tt
+        m = bisect.bisect_left(order, s, key=self.key)
+        if m > 0:
+            p = order[m - 1]
+            pe = start[p] + dur[p]
+            if pe + tt[loc[p]][loc[t]][pe] > s:
+                return False
+        if m < len(order):
+            n = order[m]
+            e = s + dur[t]
+            if e + tt[loc[t]][loc[n]][e] > start[n]:
+                return False
+        return True
+
+    def edge(self, k: int) -> int:
+        """Travel from ``order[k]`` to ``order[k + 1]``."""
+        a, b = self.order[k], self.order[k + 1]
+        e = self.start[a] + self.dur[a]
+        return self.tt[self.loc[a]][self.loc[b]][e]
+
+    def edges_around(self, i: int, j: int) -> int:
+        """Travel on the edges touching positions ``i < j``."""
+        last = len(self.order) - 1
+        cost = self.edge(i)
+        if i > 0:
+            cost += self.edge(i - 1)
+        if j - 1 > i:
+            cost += self.edge(j - 1)
+        if j < last:
+            cost += self.edge(j)
+        return cost
+
+    def link_cost(self, m: int, t: int, s: int) -> int:
+        """Travel added by slotting task ``t`` in at position ``m`` with start ``s``."""
+        order, start, dur, loc, tt = self.order, self.start, self.dur, self.loc, self.tt
+        lt = loc[t]
+        cost = 0
+        if m > 0:
+            p = order[m - 1]
+            pe = start[p] + dur[p]
+            cost += tt[loc[p]][lt][pe]
+        if m < len(order):
+            n = order[m]
+            e = s + dur[t]
+            cost += tt[lt][loc[n]][e]
+            if m > 0:
+                cost -= tt[loc[p]][loc[n]][pe]
+        return cost
+
+    def pref_cost(self, t: int, s: int) -> int:
+        wins = self.pref[t]
+        if not wins:
+            return 0
+        for a, b in wins:
+            if a <= s <= b:
+                return 0
+        return 10
+
+    def makespan(self) -> int:
+        if self.mode != "compact" or not self.order:
+            return 0
+        last = self.order[-1]
+        return self.start[last] + self.dur[last] - self.start[self.order[0]]
+
+    def cost(self) -> int:
+        """Full objective: travel between consecutive tasks (at their
+        departure slot), preference penalties, the makespan in compact
+        mode, minus priorities, plus ``drop`` for every unplaced task."""
+        order, start = self.order, self.start
+        cost = self.makespan()
+        for k in range(len(order) - 1):
+            cost += self.edge(k)
+        for t in order:
+            cost += self.pref_cost(t, start[t]) - self.prio[t]
+        for t in range(len(start)):
+            if start[t] < 0:
+                cost += self.drop[t]
+        return cost
+
+    def cheapest_insert(self, t: int) -> Optional[Tuple[int, int]]:
+        """Cheapest feasible ``(delta, start)`` for unscheduled task ``t``, if any."""
+        order, start, dur = self.order, self.start, self.dur
+        span = self.makespan()
+        best = None
+        for s in range(self.lo[t], self.hi[t] + 1):
+            if not self.fits(t, s):
+                continue
+            m = bisect.bisect_left(order, s, key=self.key)
+            delta = self.link_cost(m, t, s) + self.pref_cost(t, s)
+            if self.mode == "compact":
+                if order:
+                    first = min(start[order[0]], s)
+                    last = max(start[order[-1]] + dur[order[-1]], s + dur[t])
+                else:
+                    first, last = s, s + dur[t]
+                delta += last - first - span
+            if best is None or delta < best[0]:
+                best = (delta, s)
+        return best
+
+    # Batch neighbourhoods.  Both return the feasible moves as parallel
+    # arrays with their objective deltas, scored in one pass over the
+    # travel table: positions are indexes into ``order``.
+    def _columns(self):
+        order = np.asarray(self.order, dtype=np.int64)
+        S = np.asarray(self.start, dtype=np.int64)[order]
+        D = self.np_dur[order]
+        return order, S, D, S + D, self.np_loc[order]
+
+    def shift_moves(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Every relocation of every scheduled task to another start in its
+        window: ``(position, new start, delta)``."""
+        H, tr = self.H, self.travel
+        order, S, D, E, L = self._columns()
+        n = len(order)
+        if n == 0:
+            return np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0, np.int64)
+        k = np.arange(n)[:, None]
+        s = np.arange(H + 1)[None, :]
+
+        # taking task k out joins its neighbours
+        edge = tr[L[:-1], L[1:], E[:-1]]
+        rem = np.zeros(n, dtype=np.int64)
+        rem[1:] -= edge
+        rem[:-1] -= edge
+        if n > 2:
+            rem[1:-1] += tr[L[:-2], L[2:], E[:-2]]
+
+        # neighbours at the new start, skipping k itself
+        m = np.searchsorted(S, s)
+        p = np.where(m - 1 == k, m - 2, m - 1)
+        q = np.where(m == k, m + 1, m)
+        has_p, has_q = p >= 0, q < n
+        pc, qc = np.clip(p, 0, n - 1), np.clip(q, 0, n - 1)
+        Lk = L[:, None]
+        e = s + D[:, None]
+        ec = np.minimum(e, H)
+        to_k = tr[L[pc], Lk, E[pc]]
+        from_k = tr[Lk, L[qc], ec]
+
+        ok = (s >= self.np_lo[order][:, None]) & (s <= self.np_hi[order][:, None]) & (s != S[:, None])
+        ok &= ~has_p | (E[pc] + to_k <= s)
+        ok &= ~has_q | (e + from_k <= S[qc])
+
+        delta = (
+            rem[:, None]
+            + np.where(has_p, to_k, 0)
+            + np.where(has_q, from_k, 0)
+            - np.where(has_p & has_q, tr[L[pc], L[qc], E[pc]], 0)
+            + self.pen[order] - self.pen[order, S][:, None]
+        )
+        if self.mode == "compact":
+            big = 10 * H
+            first = np.full(n, S[0])
+            first[0] = S[1] if n > 1 else big
+            last = np.full(n, E[-1])
+            last[-1] = E[-2] if n > 1 else -big
+            span = E[-1] - S[0]
+            delta += np.maximum(last[:, None], e) - np.minimum(first[:, None], s) - span
+
+        kk, ss = np.nonzero(ok)
+        return kk, ss, delta[kk, ss]
+
+    def swap_moves(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Every exchange of start slots between positions ``i < j``:
+        ``(i, j, delta)``."""
+        H, tr = self.H, self.travel
+        order, S, D, E, L = self._columns()
+        n = len(order)
+        if n < 2:
+            return np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0, np.int64)
+        I, J = np.triu_indices(n, 1)
+        adj = J == I + 1
+        has_prev = I > 0
+        has_next = J < n - 1
+        ip = np.maximum(I - 1, 0)
+        jn = np.minimum(J + 1, n - 1)
+        # task J takes slot S[I] (rank i), task I takes slot S[J] (rank j)
+        eJ = np.minimum(S[I] + D[J], H)
+        eI = np.minimum(S[J] + D[I], H)
+        ti, tj = order[I], order[J]
+
+        ok = (self.np_lo[tj] <= S[I]) & (S[I] <= self.np_hi[tj])
+        ok &= (self.np_lo[ti] <= S[J]) & (S[J] <= self.np_hi[ti])
+        into_j = tr[L[ip], L[J], E[ip]]
+        ok &= ~has_prev | (E[ip] + into_j <= S[I])
+        # after J comes I itself when adjacent, else the old i + 1
+        j_next = np.where(adj, I, I + 1)
+        out_j = tr[L[J], L[j_next], eJ]
+        ok &= eJ + out_j <= np.where(adj, S[J], S[j_next])
+        # before I comes J when adjacent (checked above), else the old j - 1
+        into_i = tr[L[J - 1], L[I], E[J - 1]]
+        ok &= adj | (E[J - 1] + into_i <= S[J])
+        out_i = tr[L[I], L[jn], eI]
+        ok &= ~has_next | (eI + out_i <= S[jn])
+
+        edge = tr[L[:-1], L[1:], E[:-1]]
+        before = (
+            np.where(has_prev, edge[ip], 0) + edge[I]
+            + np.where(adj, 0, edge[J - 1]) + np.where(has_next, edge[np.minimum(J, n - 2)], 0)
+        )
+        after = (
+            np.where(has_prev, into_j, 0) + out_j
+            + np.where(adj, 0, into_i) + np.where(has_next, out_i, 0)
+        )
+        delta = (
+            after - before
+            + self.pen[tj, S[I]] + self.pen[ti, S[J]] - self.pen[ti, S[I]] - self.pen[tj, S[J]]
+        )
+        if self.mode == "compact":
+            delta += np.where(has_next, 0, S[J] + D[I] - E[-1])
+
+        (idx,) = np.nonzero(ok)
+        return I[idx], J[idx], delta[idx]
+
+
 class HybridScheduler:
     """
     Hybrid greedy + local search solver for task scheduling.
     """
 
-    def __init__(self, travel_fn: Callable[[object, str, str], int], mode: str = "travel") -> None:
+    def __init__(
+        self,
+        travel_fn: Callable[[object, str, str, Optional[int]], int],
+        mode: str = "travel",
+        table_fn: Optional[Callable[[object, List[str]], np.ndarray]] = None,
+        construction: str = "bitset",
+        time_budget: Optional[float] = None,
+        max_iterations: Optional[int] = None,
+        seed: int = 42,
+        temperature: Tuple[float, float] = (5.0, 0.05),
+        restarts: int = 1,
+        ruin_rate: float = 0.1,
+        ruin_max: int = 4,
+        search: str = "anneal",
+        tabu_tenure: int = 7,
+        patience: Optional[int] = None,
+    ) -> None:
+        """
+        :param travel_fn: ``(G, a, b, depart_slot) -> slots`` travel lookup
+        :param mode: objective mode, ``"travel"``, ``"preference"`` or ``"compact"``
+        :param table_fn: ``(G, locs) -> [from, to, departure slot]`` travel
+            array over ``locs``; needed by
+            the ``"bitset"`` construction, which otherwise falls back to ``"scan"``
+        :param construction: ``"bitset"`` finds all feasible starts of a task
+            at once with :class:`_SlotMasks`; ``"scan"`` tries them one by one
+        :param time_budget: upper bound in wall-clock seconds for local
+            search; the best schedule seen so far is returned when it runs
+            out, or earlier once the search stalls (``patience``)
+        :param max_iterations: local-search iteration cap; defaults to 300
+            without a time budget and to unbounded with one
+        :param seed: base seed; start ``k`` of a multi-start run uses
+            ``seed + k`` for its construction order and local search
+        :param temperature: ``(start, end)`` annealing temperatures, cooled
+            geometrically over the budget
+        :param restarts: number of independent starts; more than one runs
+            them on the shared process pool and keeps the cheapest result
+        :param ruin_rate: share of local-search moves that are
+            ruin-and-recreate: remove up to ``ruin_max`` tasks and reinsert
+            them, together with every unscheduled task, by cheapest
+            feasible insertion
+        :param search: ``"anneal"`` runs simulated annealing with random
+            moves and finishes with a steepest-descent polish;
+            ``"steepest"`` only descends; ``"tabu"`` runs tabu search.  The
+            last two score every shift and swap per step with
+            :meth:`_State.shift_moves` / :meth:`_State.swap_moves`
+        :param tabu_tenure: steps a moved task stays tabu
+        :param patience: annealing iterations without a new best after
+            which the search stops before its budget; defaults to
+            ``STALL_PER_TASK`` per task, at least ``STALL_MIN``
+        """
         self.travel_fn = travel_fn
         self.mode = mode
+        self.table_fn = table_fn
+        self.construction = construction if table_fn is not None else "scan"
+        self.time_budget = time_budget
+        if max_iterations is None:
+            max_iterations = 300 if time_budget is None else 10 ** 9
+        self.max_iterations = max_iterations
+        self.seed = seed
+        self.temperature = temperature
+        self.restarts = max(1, int(restarts))
+        self.ruin_rate = ruin_rate
+        self.ruin_max = max(1, ruin_max)
+        self.search = search
+        self.tabu_tenure = tabu_tenure
+        self.patience = patience
         print(f"[HYBRID] Initializing HybridScheduler with mode={self.mode}")  # << LOG
 
     def _feasible_insert(
         self, sched: List[_Placed], task: _LiteTask, start: int, H: int, G: object
     ) -> bool:
+        """Can ``task`` start at ``start`` given ``sched``?
+
+        ``sched`` must be sorted by start (it never overlaps, so it is
+        sorted by end too): only the two placements around the insertion
+        point can clash or impose travel, and bisect finds them in
+        O(log n).
+        """
         end = start + task.duration
         a, b = task.window
         if start < a or start > min(b, H - task.duration):
             return False
-        for p in sched:
-            if not (end <= p.start or start >= p.end):
+        m = bisect.bisect_left(sched, start, key=_start_of)
+        if m > 0:
+            before = sched[m - 1]
+            if before.end > start:
                 return False
-        before = None
-        for p in sched:
-            if p.end <= start and (before is None or p.end > before.end):
-                before = p
-        after = None
-        for p in sched:
-            if p.start >= end and (after is None or p.start < after.start):
-                after = p
-        if before:
-            need = self.travel_fn(G, before.loc, task.loc)
+            need = self.travel_fn(G, before.loc, task.loc, before.end)
             if start < before.end + need:
                 return False
-        if after:
-            need = self.travel_fn(G, task.loc, after.loc)
+        if m < len(sched):
+            after = sched[m]
+            if after.start < end:
+                return False
+            need = self.travel_fn(G, task.loc, after.loc, end)
             if after.start < end + need:
                 return False
         return True
 
-    # -------------------------
-    # Objective function
-    # -------------------------
-    def _objective(self, sched: List[_Placed], tasks: Dict[str, _LiteTask], G: object) -> int:
-        travel_cost = 0
-        ordered = sorted(sched, key=lambda p: p.start)
-        for i in range(len(ordered) - 1):
-            travel_cost += self.travel_fn(G, ordered[i].loc, ordered[i + 1].loc)
-
-        preference_cost = 0
-        if self.mode == "preference":
-            for p in ordered:
-                t = tasks[p.id]
-                if t.prefer_win:
-                    ok = False
-                    for a, b in t.prefer_win:
-                        if a <= p.start <= b:
-                            ok = True
-                            break
-                    if not ok:
-                        preference_cost += 10
-
-        makespan = 0
-        if self.mode == "compact" and ordered:
-            makespan = ordered[-1].end - ordered[0].start
-
-        priority_reward = 0
-        for p in ordered:
-            priority_reward += tasks[p.id].priority
-
-        cost = travel_cost + preference_cost + makespan - priority_reward
-        return cost
+    def _travel_table(self, G: object, locs: List[str], H: int) -> np.ndarray:
+        """``[from, to, departure slot]`` travel over ``locs`` for slots ``0..H``."""
+        if self.table_fn is not None:
+            return np.asarray(self.table_fn(G, locs), dtype=np.int64)[:, :, : H + 1]
+        return np.array(
+            [[[self.travel_fn(G, a, b, d) for d in range(H + 1)] for b in locs] for a in locs],
+            dtype=np.int64,
+        )
+
+    def _build_initial(
+        self,
+        tasks: List[_LiteTask],
+        H: int,
+        G: object,
+        order_seed: Optional[int] = None,
+        travel: Optional[np.ndarray] = None,
+    ) -> List[_Placed]:
+        # With an order_seed the tightness score is jittered by up to 30% so
+        # each start of a multi-start run builds from a different ordering;
+        # fixed tasks still go first.
+        jitter = random.Random(order_seed) if order_seed is not None else None
 
-    def _build_initial(self, tasks: List[_LiteTask], H: int, G: object) -> List[_Placed]:
         def sort_key(t: _LiteTask):
             span = max(1, t.window[1] - t.window[0])
             fixed_priority = 1000 if t.fixed else 0
-            return (-(1000 / span + fixed_priority), t.priority, -span)
+            tight = 1000 / span
+            if jitter is not None:
+                tight *= 1.0 + 0.3 * jitter.random()
+            return (-(tight + fixed_priority), t.priority, -span)
 
         ordered = sorted(tasks, key=sort_key)
         schedule: List[_Placed] = []
         print(f"[HYBRID] Building initial solution with {len(tasks)} tasks")  # << LOG
 
+        masks = None
+        if self.construction == "bitset":
+            if travel is None:
+                travel = self._travel_table(G, sorted({t.loc for t in tasks}), H)
+            masks = _SlotMasks(tasks, H, travel)
+
         for t in ordered:
-            placed = False
-            earliest_start = t.window[0]
-            latest_start = min(t.window[1], H - t.duration)
-            for s in range(earliest_start, latest_start + 1):
-                if self._feasible_insert(schedule, t, s, H, G):
-                    schedule.append(_Placed(t.id, t.title, t.loc, s, s + t.duration))
-                    placed = True
-                    break
-            if not placed and t.fixed:
-                schedule.append(_Placed(t.id, t.title, t.loc, H + 1000, H + 1000 + t.duration))
+            p = None
+            if masks is not None:
+                starts = masks.feasible_starts(t)
+                if len(starts):
+                    s = int(starts[0])
+                    p = _Placed(t.id, t.title, t.loc, s, s + t.duration)
+            else:
+                earliest_start = t.window[0]
+                latest_start = min(t.window[1], H - t.duration)
+                for s in range(earliest_start, latest_start + 1):
+                    if self._feasible_insert(schedule, t, s, H, G):
+                        p = _Placed(t.id, t.title, t.loc, s, s + t.duration)
+                        break
+            # Tasks that do not fit (fixed or not) stay unscheduled; local
+            # search keeps retrying them through ruin-and-recreate.
+            if p is not None:
+                bisect.insort(schedule, p, key=_start_of)
+                if masks is not None:
+                    masks.place(p)
 
         print(f"[HYBRID] Initial solution built: {len(schedule)} tasks placed")  # << LOG
         return schedule
 
     # -------------------------
-    # Local search (Move + Swap)
+    # Ruin and recreate
     # -------------------------
-    def _local_search(
-        self,
-        base: List[_Placed],
-        tasks: Dict[str, _LiteTask],
-        H: int,
-        G: object,
-        iterations: int = 300,
-    ) -> List[_Placed]:
-        print(f"[HYBRID] Starting local search with {iterations} iterations")  # << LOG
+    def _ruin_recreate(self, state: _State, rng: random.Random) -> None:
+        """Remove up to ``ruin_max`` placements, then greedily reinsert them
+        and every unscheduled task, fixed and tightest window first."""
+        order, start = state.order, state.start
+        n = len(order)
+        k = rng.randint(1, min(self.ruin_max, n)) if n else 0
+        if k and rng.random() < 0.5:
+            # a run of neighbours frees one contiguous stretch of the day
+            first = rng.randrange(n - k + 1)
+            for _ in range(k):
+                start[order.pop(first)] = -1
+        else:
+            for _ in range(k):
+                start[order.pop(rng.randrange(len(order)))] = -1
+
+        pending = [t for t in range(len(start)) if start[t] < 0]
+        pending.sort(key=lambda t: (-state.drop[t], state.hi[t] - state.lo[t] + rng.random()))
+        for t in pending:
+            hit = state.cheapest_insert(t)
+            if hit is not None:
+                state.place(t, hit[1])
+
+    # -------------------------
+    # Local search (Move + Swap + Ruin/Recreate), simulated annealing
+    # -------------------------
+    # The schedule stays sorted by start, so a move or swap only changes the
+    # travel edges next to the touched positions, the preference term of
+    # the touched tasks and (for "compact") the two ends of the day.
+    # Priority and drop costs are constant because the placed set is;
+    # ruin-and-recreate changes it and is re-evaluated in full.  Rejected
+    # moves are undone in place and snapshots go to preallocated buffers.
+    def _local_search(self, state: _State, seed: Optional[int] = None) -> int:
+        """Anneal ``state`` in place; it is left holding the best schedule,
+        whose cost is returned."""
+        iterations = self.max_iterations
+        print(f"[HYBRID] Starting local search: {iterations} iterations max, budget={self.time_budget}s")  # << LOG
 
-        rng = random.Random(42)
-        best = [p for p in base]
-        best_cost = self._objective(best, tasks, G)
+        rng = random.Random(self.seed if seed is None else seed)
+        order, start, lo, hi = state.order, state.start, state.lo, state.hi
+        cur_cost = state.cost()
+        best_cost = cur_cost
+        best_order, best_start = list(order), array("i", start)
+        saved_order, saved_start = list(order), array("i", start)
 
-        for _ in range(iterations):
-            cand = [p for p in best]
+        t_start, t_end = self.temperature
+        cooling = math.log(t_end / t_start)
+        temp = t_start
+        t0 = time.perf_counter()
+        deadline = t0 + self.time_budget if self.time_budget is not None else None
+        patience = self.patience or max(STALL_MIN, STALL_PER_TASK * len(start))
+        last_best = 0
+
+        it = 0
+        while it < iterations:
+            # Cool by whichever of time or iterations is further along; the
+            # clock is only read every 64 iterations.
+            if it & 63 == 0:
+                if it - last_best >= patience:
+                    break
+                progress = it / iterations
+                if deadline is not None:
+                    now = time.perf_counter()
+                    if now >= deadline:
+                        break
+                    progress = max(progress, (now - t0) / self.time_budget)
+                temp = t_start * math.exp(cooling * progress)
+            it += 1
+
+            n = len(order)
             op = rng.random()
-            if op < 0.5 and cand:
-                k = rng.randrange(len(cand))
-                p = cand.pop(k)
-                t = tasks[p.id]
-                shift = rng.choice([-3, -2, -1, 1, 2, 3])
-                new_start = p.start + shift
-                new_start = max(t.window[0], min(new_start, t.window[1], H - t.duration))
-                if self._feasible_insert(cand, t, new_start, H, G):
-                    cand.append(_Placed(p.id, p.title, p.loc, new_start, new_start + t.duration))
+            delta = 0
+            undo = _NONE
+            if op < self.ruin_rate:
+                saved_order[:] = order
+                saved_start[:] = start
+                self._ruin_recreate(state, rng)
+                delta = state.cost() - cur_cost
+                undo = _RESTORE
+            elif op < 0.5 + self.ruin_rate / 2 and n:
+                k = rng.randrange(n)
+                t = order[k]
+                old = start[t]
+                new = max(lo[t], min(old + rng.choice(_SHIFTS), hi[t]))
+                if new != old:
+                    span = state.makespan()
+                    del order[k]
+                    if state.fits(t, new):
+                        m = bisect.bisect_left(order, new, key=state.key)
+                        delta = (
+                            state.link_cost(m, t, new) - state.link_cost(k, t, old)
+                            + state.pref_cost(t, new) - state.pref_cost(t, old)
+                        )
+                        start[t] = new
+                        order.insert(m, t)
+                        delta += state.makespan() - span
+                        undo, ua, ub, u_old = _MOVE, m, k, old
+                    else:
+                        order.insert(k, t)
+            elif n >= 2:
+                i = rng.randrange(n)
+                j = rng.randrange(n - 1)
+                if j >= i:
+                    j += 1
+                if i > j:
+                    i, j = j, i
+                ti, tj = order[i], order[j]
+                si, sj = start[ti], start[tj]
+                before = (
+                    state.edges_around(i, j) + state.makespan()
+                    + state.pref_cost(ti, si) + state.pref_cost(tj, sj)
+                )
+                # starts are exchanged, so each takes the other's rank
+                del order[j], order[i]
+                ok = False
+                if state.fits(tj, si):
+                    start[tj] = si
+                    order.insert(i, tj)
+                    ok = state.fits(ti, sj)
+                    del order[i]
+                if ok:
+                    start[ti] = sj
+                    order.insert(i, tj)
+                    order.insert(j, ti)
+                    delta = (
+                        state.edges_around(i, j) + state.makespan()
+                        + state.pref_cost(ti, sj) + state.pref_cost(tj, si)
+                        - before
+                    )
+                    undo, ua, ub = _SWAP, i, j
                 else:
-                    cand.append(p)
+                    start[tj] = sj
+                    order.insert(i, ti)
+                    order.insert(j, tj)
+
+            if undo == _NONE:
+                continue
+            if delta <= 0 or rng.random() < math.exp(-delta / temp):
+                cur_cost += delta
+                if cur_cost < best_cost:
+                    best_cost = cur_cost
+                    best_order[:] = order
+                    best_start[:] = start
+                    last_best = it
+            elif undo == _MOVE:
+                t = order.pop(ua)
+                start[t] = u_old
+                order.insert(ub, t)
+            elif undo == _SWAP:
+                ti, tj = order[ub], order[ua]
+                start[ti], start[tj] = start[tj], start[ti]
+                order[ua], order[ub] = ti, tj
             else:
-                if len(cand) >= 2:
-                    i, j = rng.sample(range(len(cand)), 2)
-                    pi, pj = cand[i], cand[j]
-                    ti, tj = tasks[pi.id], tasks[pj.id]
-                    rest = [cand[m] for m in range(len(cand)) if m not in (i, j)]
-                    if self._feasible_insert(rest, ti, pj.start, H, G) and \
-                       self._feasible_insert(rest, tj, pi.start, H, G):
-                        cand[i] = _Placed(pi.id, pi.title, pi.loc, pj.start, pj.start + ti.duration)
-                        cand[j] = _Placed(pj.id, pj.title, pj.loc, pi.start, pi.start + tj.duration)
-
-            cost = self._objective(cand, tasks, G)
-            if cost < best_cost or rng.random() < 0.05:
-                best = cand
-                best_cost = cost
-
-        print(f"[HYBRID] Local search finished. Best cost = {best_cost}")  # << LOG
-        print(f"[HYBRID] Final schedule size = {len(best)} tasks")         # << LOG
-        return best
+                order[:] = saved_order
+                start[:] = saved_start
+
+        order[:] = best_order
+        start[:] = best_start
+        print(f"[HYBRID] Local search finished after {it} iterations. Best cost = {best_cost}")  # << LOG
+        print(f"[HYBRID] Final schedule size = {len(order)} tasks")         # << LOG
+        return best_cost
+
+    # -------------------------
+    # Batch search (steepest descent / tabu)
+    # -------------------------
+    def _batch_search(self, state: _State, tabu: bool, polish: bool = False) -> int:
+        """Repeatedly apply the best of all shift and swap moves.
+
+        Steepest descent stops at the first step without an improving move;
+        tabu search keeps taking the best non-tabu move (or any move that
+        beats the best cost so far) until the budget runs out.  ``state``
+        is left holding the best schedule, whose cost is returned.  A
+        polish pass after annealing ignores the budget; it is a few steps.
+        """
+        order, start = state.order, state.start
+        cur_cost = state.cost()
+        best_cost = cur_cost
+        best_order, best_start = list(order), array("i", start)
+        tabu_until = np.zeros(len(start), dtype=np.int64)
+        deadline = None
+        if self.time_budget is not None and not polish:
+            deadline = time.perf_counter() + self.time_budget
+        limit = 10 ** 9 if polish else self.max_iterations
+
+        step = 0
+        while step < limit:
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            step += 1
+            kk, ss, dd = state.shift_moves()
+            ii, jj, ds = state.swap_moves()
+            deltas = np.concatenate([dd, ds])
+            if tabu:
+                pos = np.asarray(order, dtype=np.int64)
+                moved = np.concatenate([tabu_until[pos[kk]], np.maximum(tabu_until[pos[ii]], tabu_until[pos[jj]])])
+                allowed = (moved < step) | (cur_cost + deltas < best_cost)
+                deltas = np.where(allowed, deltas, np.iinfo(np.int64).max)
+            if not len(deltas):
+                break
+            pick = int(np.argmin(deltas))
+            delta = int(deltas[pick])
+            if delta == np.iinfo(np.int64).max or (not tabu and delta >= 0):
+                break
+
+            if pick < len(dd):
+                t = order.pop(int(kk[pick]))
+                state.place(t, int(ss[pick]))
+                tabu_until[t] = step + self.tabu_tenure
+            else:
+                i, j = int(ii[pick - len(dd)]), int(jj[pick - len(dd)])
+                ti, tj = order[i], order[j]
+                start[ti], start[tj] = start[tj], start[ti]
+                order[i], order[j] = tj, ti
+                tabu_until[ti] = tabu_until[tj] = step + self.tabu_tenure
+
+            cur_cost += delta
+            if cur_cost < best_cost:
+                best_cost = cur_cost
+                best_order[:] = order
+                best_start[:] = start
+
+        order[:] = best_order
+        start[:] = best_start
+        print(f"[HYBRID] Batch search ({'tabu' if tabu else 'steepest'}) finished after {step} steps. Best cost = {best_cost}")  # << LOG
+        return best_cost
+
+    def _run_start(
+        self, lite_tasks: List[_LiteTask], H: int, travel: np.ndarray, k: int, G: object = None
+    ) -> Tuple[int, List[_Placed]]:
+        """One construction + local-search run; start 0 uses the plain greedy order.
+
+        ``travel`` is the instance's ``[from, to, departure slot]`` table
+        over its sorted locations; ``G`` is only needed by the ``"scan"``
+        construction.
+        """
+        locs = sorted({t.loc for t in lite_tasks})
+        initial = self._build_initial(
+            lite_tasks, H, G, order_seed=None if k == 0 else self.seed + k, travel=travel
+        )
+        state = _State(lite_tasks, H, self.mode, {loc: i for i, loc in enumerate(locs)}, travel)
+        ix = {t.id: i for i, t in enumerate(lite_tasks)}
+        for p in initial:
+            state.place(ix[p.id], p.start)
+
+        if self.search == "anneal":
+            self._local_search(state, seed=self.seed + k)
+            cost = self._batch_search(state, tabu=False, polish=True)
+        else:
+            cost = self._batch_search(state, tabu=self.search == "tabu")
+        best = []
+        for i in state.order:
+            t = lite_tasks[i]
+            best.append(_Placed(t.id, t.title, t.loc, state.start[i], state.start[i] + t.duration))
+        return cost, best
 
     # -------------------------
     # Public solve() API
@@ -208,10 +829,21 @@ class HybridScheduler:
                 )
             )
 
-        initial = self._build_initial(lite_tasks, H, G)
-        task_map = {t.id: t for t in lite_tasks}
-
-        improved = self._local_search(initial, task_map, H, G)
+        # Starts only need this table; the matrix itself is not shipped to
+        # pool workers unless the "scan" construction asks for it.
+        travel = self._travel_table(G, sorted({t.loc for t in lite_tasks}), H)
+        if self.restarts > 1:
+            from .solver_pool import get_pool
+            pool = get_pool()
+            G_arg = G if self.construction == "scan" else None
+            futures = [pool.submit(_solve_start, self, lite_tasks, H, travel, k, G_arg) for k in range(self.restarts)]
+            results = [f.result() for f in futures]
+        else:
+            results = [self._run_start(lite_tasks, H, travel, 0, G)]
+        # min() keeps the first of equal costs, i.e. the lowest start index,
+        # so the winner does not depend on which worker finished first.
+        best_cost, improved = min(results, key=lambda r: r[0])
+        print(f"[HYBRID] {len(results)} start(s), best cost = {best_cost}")  # << LOG
 
         items: List[Dict[str, str]] = []
         for p in improved:
@@ -230,3 +862,10 @@ class HybridScheduler:
         items.sort(key=lambda x: x["start"])
         print(f"[HYBRID] solve() finished. Returned {len(items)} tasks")  # << LOG
         return items
+
+
+def _solve_start(
+    scheduler: HybridScheduler, lite_tasks: List[_LiteTask], H: int, travel: np.ndarray, k: int, G: object = None
+) -> Tuple[int, List[_Placed]]:
+    # Module-level so it can be pickled into pool workers.
+    return scheduler._run_start(lite_tasks, H, travel, k, G)
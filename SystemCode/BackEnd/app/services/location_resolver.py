@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import re
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+from .travel_graph import TravelMatrix
+from ..schemas.tasks import TaskIn
+
+
+# Common campus nicknames -> canonical location names.  Only applied when
+# the target actually exists in the travel matrix.
+ALIASES: Dict[str, str] = {
+    "central library": "CLB",
+    "central lib": "CLB",
+    "clb": "CLB",
+    "university town": "UTown",
+    "u town": "UTown",
+    "university sports centre": "USC",
+    "university sports center": "USC",
+    "sports centre": "USC",
+    "medical science library": "MSL Library",
+    "science library": "MSL Library",
+    "the deck": "The Deck",
+    "deck": "The Deck",
+    "science canteen": "Science Canteen",
+    "frontier": "Science Canteen",
+}
+
+# Minimum Dice similarity of trigram sets for a fuzzy match.
+MIN_SCORE = 0.45
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+# Building/room numbers with their letter suffix: "COM 1" -> "1", "E4A" -> "4a".
+_CODE = re.compile(r"\d+[a-z]*")
+
+
+def _norm(s: str) -> str:
+    """Lower-case and drop spaces/punctuation: ``"COM 1"`` -> ``"com1"``."""
+    return _NON_ALNUM.sub("", s.lower())
+
+
+def _codes(s: str) -> Tuple[str, ...]:
+    """Number tokens of ``s``; a fuzzy match must agree on them exactly so
+    that ``"COM2"`` never lands on ``"COM1"``."""
+    return tuple(_CODE.findall(s.lower()))
+
+
+def _trigrams(key: str) -> Set[str]:
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class LocationResolver:
+    """Maps free-text locations onto the nodes of a travel matrix.
+
+    Lookups try, in order: an exact match, a normalised match, the alias
+    table and finally trigram similarity through an inverted index, among
+    nodes carrying the same number tokens (see :func:`_codes`).  All
+    indexes are built once per matrix; answers are memoised.
+    """
+
+    def __init__(self, nodes: List[str]) -> None:
+        self.nodes = nodes
+        self._exact = set(nodes)
+        self._by_key: Dict[str, str] = {}
+        for n in nodes:
+            self._by_key.setdefault(_norm(n), n)
+        for alias, target in ALIASES.items():
+            if target in self._exact:
+                self._by_key.setdefault(_norm(alias), target)
+        self._grams: List[Set[str]] = [_trigrams(_norm(n)) for n in nodes]
+        self._codes: List[Tuple[str, ...]] = [_codes(n) for n in nodes]
+        self._postings: Dict[str, List[int]] = {}
+        for i, grams in enumerate(self._grams):
+            for g in grams:
+                self._postings.setdefault(g, []).append(i)
+        self._memo: Dict[str, Optional[str]] = {}
+
+    def _fuzzy(self, loc: str, key: str) -> Optional[str]:
+        grams = _trigrams(key)
+        codes = _codes(loc)
+        shared: Dict[int, int] = {}
+        for g in grams:
+            for i in self._postings.get(g, ()):
+                shared[i] = shared.get(i, 0) + 1
+        best: Tuple[float, int] = (0.0, -1)
+        for i, hits in shared.items():
+            if self._codes[i] != codes:
+                continue
+            score = 2.0 * hits / (len(grams) + len(self._grams[i]))
+            if score > best[0]:
+                best = (score, i)
+        return self.nodes[best[1]] if best[0] >= MIN_SCORE else None
+
+    def resolve(self, loc: Optional[str]) -> Optional[str]:
+        """Canonical node for ``loc``, or ``None`` when nothing is close."""
+        if not loc:
+            return None
+        if loc in self._exact:
+            return loc
+        hit = self._memo.get(loc)
+        if hit is not None or loc in self._memo:
+            return hit
+        key = _norm(loc)
+        hit = self._by_key.get(key) or (self._fuzzy(loc, key) if key else None)
+        if len(self._memo) < 4096:
+            self._memo[loc] = hit
+        return hit
+
+
+# One resolver per loaded matrix; keyed by identity since cached matrices
+# are shared and immutable.
+_resolvers: Dict[int, Tuple[TravelMatrix, LocationResolver]] = {}
+_resolvers_lock = threading.Lock()
+
+
+def resolver_for(G: TravelMatrix) -> LocationResolver:
+    with _resolvers_lock:
+        hit = _resolvers.get(id(G))
+        if hit is not None and hit[0] is G:
+            return hit[1]
+        if len(_resolvers) >= 8:
+            _resolvers.clear()
+        r = LocationResolver(list(G.nodes))
+        _resolvers[id(G)] = (G, r)
+        return r
+
+
+def resolve_tasks(G: TravelMatrix, tasks: List[TaskIn]) -> List[TaskIn]:
+    """Return ``tasks`` with locations snapped to canonical travel nodes.
+
+    Unresolvable locations are left untouched (and stay unreachable).
+    """
+    r = resolver_for(G)
+    out: List[TaskIn] = []
+    for t in tasks:
+        canon = r.resolve(t.location)
+        out.append(t if canon is None or canon == t.location else t.model_copy(update={"location": canon}))
+    return out
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import copy
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Tuple
+
+from .location_resolver import resolve_tasks
+from ..core.config import settings
+from ..schemas.tasks import TaskIn
+
+
+def plan_key(G, tasks: List[TaskIn], mode: str, engine: str, **params: Any) -> str:
+    """Content address of a solve.
+
+    Tasks are normalised first (locations snapped onto travel nodes, empty
+    preference windows dropped, order by id) so equivalent requests share a
+    key; the travel matrix contributes its commute mode and version, so a
+    re-timed ``travel_times`` table never serves stale plans.  ``params``
+    are the remaining solver options (budget, seed, formulation, ...).
+    """
+    norm = sorted(
+        (t.model_dump(exclude={"prefer_win"}) | {"prefer_win": t.prefer_win or []} for t in resolve_tasks(G, tasks)),
+        key=lambda d: (d["id"], json.dumps(d, sort_keys=True)),
+    )
+    payload = {
+        "tasks": norm,
+        "mode": mode,
+        "engine": engine,
+        "commute": G.commute,
+        "version": G.version,
+        "params": params,
+    }
+    raw = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class PlanCache:
+    """Size-bounded LRU of solve results with a TTL.
+
+    :meth:`get_or_solve` returns a copy of the cached value when the key is
+    fresh.  Otherwise the first caller runs ``solve`` while identical
+    concurrent callers wait for its result (singleflight), so a burst of
+    repeated "Generate" clicks costs one solve.  Failures are passed to
+    every waiter and never cached.
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = max(0, maxsize)
+        self.ttl = ttl
+        self._items: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0
+
+    def get_or_solve(self, key: str, solve: Callable[[], Any]) -> Any:
+        with self._lock:
+            hit = self._items.get(key)
+            if hit is not None:
+                if hit[0] > time.monotonic():
+                    self._items.move_to_end(key)
+                    print(f"[CACHE] hit {key[:12]}")  # << LOG
+                    return copy.deepcopy(hit[1])
+                del self._items[key]
+            fut = self._inflight.get(key)
+            leader = fut is None
+            if leader:
+                fut = self._inflight[key] = Future()
+        if not leader:
+            print(f"[CACHE] waiting on in-flight solve {key[:12]}")  # << LOG
+            return copy.deepcopy(fut.result())
+
+        try:
+            value = solve()
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[key]
+            fut.set_exception(e)
+            raise
+        with self._lock:
+            self._items[key] = (time.monotonic() + self.ttl, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+            del self._inflight[key]
+        fut.set_result(value)
+        return copy.deepcopy(value)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+plan_cache = PlanCache(settings.PLAN_CACHE_SIZE, settings.PLAN_CACHE_TTL)
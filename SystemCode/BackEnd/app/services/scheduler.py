@@ -1,46 +1,94 @@
-from typing import List
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 from fastapi import HTTPException
 from ortools.sat.python import cp_model
 from math import ceil
 
-from .travel_graph import travel_slots
+import numpy as np
+
+from .travel_graph import travel_slots, travel_tables, HORIZON, UNREACHABLE
+from .location_resolver import resolve_tasks
+from .solver_pool import core_quota
+from .plan_cache import plan_cache, plan_key
+from ..core.config import settings
 from ..schemas.tasks import TaskIn
 from ..utils.timeutils import to_slot, slot_to_hhmm
 from ..core.constants import DAY_START, DAY_END, SLOT_MIN
 
 
-def solve_plan(G, tasks_def: List[TaskIn], mode: str = "travel", engine: str = "cp"):
-    """Plan a list of tasks using either CP‑SAT or a custom hybrid solver.
+# Circuit model: successors/predecessors kept per task when pruning arcs;
+# None keeps every feasible arc (pruning can cut off optimal tours).
+CIRCUIT_NEIGHBOURS: Optional[int] = None
 
-    :param G: the travel graph instance
-    :param tasks_def: list of tasks to schedule
-    :param mode: objective mode; one of ``"travel"``, ``"preference"``, ``"compact"``
-    :param engine: solver backend; ``"cp"`` (default) uses OR‑Tools CP‑SAT,
-        ``"hybrid"`` uses a custom greedy/local search solver defined in
-        :mod:`app.services.hybrid_solver`.  Additional values fall back to
-        ``"cp"``.
 
-    The return value is a list of dicts each with ``id``, ``title``,
-    ``loc``, ``start`` and ``end`` keys where ``start`` and ``end`` are
-    ``HH:MM`` formatted strings.  This signature is backwards
-    compatible with earlier versions; callers that ignore the
-    ``engine`` parameter will continue to use the CP based solver.
+# Objective modes understood by the CP model; anything else plans as "travel".
+MODES = ("travel", "preference", "compact")
+
+
+def split_components(G, tasks_def: List[TaskIn]) -> List[List[TaskIn]]:
+    """Split ``tasks_def`` into groups that can never constrain each other.
+
+    Two tasks interact unless one of them, placed as late as its window
+    allows, still finishes and travels (slowest departure) to the other's
+    location before the other's earliest start.  The connected components
+    of that interaction graph are independent sub-problems; they are
+    returned ordered by earliest window.
     """
+    H = int((DAY_END - DAY_START).total_seconds() // 60 // SLOT_MIN)
+    dur = np.array([max(1, ceil(t.duration_min / SLOT_MIN)) for t in tasks_def])
+    lb = np.array([max(0, to_slot(t.earliest)) for t in tasks_def])
+    ub = np.maximum(lb, np.minimum([to_slot(t.latest) for t in tasks_def], H - dur))
 
-    # If the hybrid engine is requested, delegate to the custom solver.
-    if engine == "hybrid":
-        # Import lazily to avoid pulling in heavy modules on CP code path
-        from .hybrid_solver import HybridScheduler
-        # Instantiate solver with the travel time callback and mode
-        hs = HybridScheduler(travel_fn=travel_slots, mode=mode)
-        return hs.solve(G, tasks_def)
+    locs = sorted({t.location for t in tasks_def})
+    loc_ix = {loc: k for k, loc in enumerate(locs)}
+    li = np.array([loc_ix[t.location] for t in tasks_def])
+    slowest = travel_tables(G, locs).max(axis=2)
+
+    # before[i, j]: i is always done and travelled before j can start
+    before = (ub + dur)[:, None] + slowest[li][:, li] <= lb[None, :]
+    interact = ~(before | before.T)
 
+    label = np.full(len(tasks_def), -1)
+    groups: List[List[int]] = []
+    for root in range(len(tasks_def)):
+        if label[root] >= 0:
+            continue
+        label[root] = len(groups)
+        members, frontier = [root], [root]
+        while frontier:
+            (new,) = np.nonzero(interact[frontier].any(axis=0) & (label < 0))
+            label[new] = len(groups)
+            members.extend(new.tolist())
+            frontier = new.tolist()
+        groups.append(sorted(members))
+    groups.sort(key=lambda g: lb[g].min())
+    return [[tasks_def[i] for i in g] for g in groups]
 
+
+def _build_cp_model(
+    G,
+    tasks_def: List[TaskIn],
+    formulation: str = "pairwise",
+    hint: Optional[Dict[str, int]] = None,
+):
+    """CP-SAT model for ``tasks_def``; returns ``(model, starts, ends, pres,
+    objectives)`` with the variables keyed by task id and one objective
+    expression per mode in :data:`MODES`.  The model has no objective set;
+    the auxiliary variables of every mode are built up front so any of
+    them can be minimised on the same constraints.
+
+    ``hint`` maps the ids of a known schedule to their start slots; every
+    presence, start/end and ordering variable is hinted from it.
+    """
     # 总 horizon（单位：slot）
     H = int((DAY_END - DAY_START).total_seconds() // 60 // SLOT_MIN)
     model = cp_model.CpModel()
 
-    starts, ends, pres, itvs = {}, {}, {}, {}
+    starts, ends, pres, itvs, bounds = {}, {}, {}, {}, {}
 
     # --- 定义变量 ---
     for t in tasks_def:
@@ -68,6 +116,12 @@ def solve_plan(G, tasks_def: List[TaskIn], mode: str = "travel", engine: str = "
         itv = model.NewOptionalIntervalVar(s, dur, e, p, f"iv_{t.id}")
 
         starts[t.id], ends[t.id], pres[t.id], itvs[t.id] = s, e, p, itv
+        bounds[t.id] = (dur, s_lb, s_ub)
+        if hint is not None:
+            model.AddHint(p, int(t.id in hint))
+            if t.id in hint:
+                model.AddHint(s, hint[t.id])
+                model.AddHint(e, hint[t.id] + dur)
         if t.fixed:
             model.Add(p == 1)
 
@@ -75,14 +129,84 @@ def solve_plan(G, tasks_def: List[TaskIn], mode: str = "travel", engine: str = "
     model.AddNoOverlap(list(itvs.values()))
 
     # --- travel 顺序约束 ---
+    travel_costs: list = []
+    if formulation == "circuit":
+        travel_costs = _add_circuit(model, G, tasks_def, starts, ends, pres, bounds, hint)
+    else:
+        _add_pairwise(model, G, tasks_def, starts, ends, pres, hint, bounds)
+
+    # --- 目标函数（各模式共用约束，只换目标）---
+    # base reward: priority
+    base = [-int(t.priority) * pres[t.id] for t in tasks_def]
+
+    # preference
+    pref_terms: list = []
+    for t in tasks_def:
+        if t.prefer_win:
+            for a, b in t.prefer_win:
+                a_s, b_s = to_slot(a), to_slot(b)
+                good = model.NewBoolVar(f"pref_{t.id}_{a}_{b}")
+                # 只有任务存在时才考虑偏好
+                model.Add(starts[t.id] >= a_s).OnlyEnforceIf([good, pres[t.id]])
+                model.Add(starts[t.id] <= b_s).OnlyEnforceIf([good, pres[t.id]])
+                pref_terms.append(-5 * good)
+
+    # compact
+    makespan = model.NewIntVar(0, H, "makespan")
+    for t in tasks_def:
+        model.Add(ends[t.id] <= makespan).OnlyEnforceIf(pres[t.id])
+
+    objectives = {}
+    for mode, penalties in (("travel", base), ("preference", pref_terms + base), ("compact", [makespan] + base)):
+        if travel_costs:
+            # travel only breaks ties: a day's legs total at most H slots
+            objectives[mode] = (H + 1) * sum(penalties) + sum(travel_costs)
+        else:
+            objectives[mode] = sum(penalties)
+    return model, starts, ends, pres, objectives
+
+
+def _add_pairwise(model, G, tasks_def: List[TaskIn], starts, ends, pres, hint=None, bounds=None) -> None:
+    """Two ordering booleans and a reified travel gap for every task pair.
+
+    Tasks pinned to one start slot (fixed, with ``bounds`` giving a single
+    start) travel at a constant departure time; pairs of pinned tasks that
+    already respect each other need no constraint at all.  Departure
+    tables of the other tasks are cut down to their end-slot range.
+    """
+    # pinned task -> (start, end); other task -> (end-slot index, first, last end slot)
+    pinned, depart = {}, {}
+    if bounds is not None:
+        for t in tasks_def:
+            dur, s_lb, s_ub = bounds[t.id]
+            if t.fixed and s_lb == s_ub:
+                pinned[t.id] = (s_lb, s_lb + dur)
+            elif G.time_dependent and s_ub + dur <= HORIZON:
+                k = model.NewIntVar(0, s_ub - s_lb, f"dep_{t.id}")
+                model.Add(k == ends[t.id] - (s_lb + dur))
+                depart[t.id] = (k, s_lb + dur, s_ub + dur)
+
     for i in range(len(tasks_def)):
         for j in range(i + 1, len(tasks_def)):
             ti, tj = tasks_def[i], tasks_def[j]
-            lij = travel_slots(G, ti.location, tj.location)
-            lji = travel_slots(G, tj.location, ti.location)
+            if ti.id in pinned and tj.id in pinned:
+                (si, ei), (sj, ej) = pinned[ti.id], pinned[tj.id]
+                if sj >= ei + travel_slots(G, ti.location, tj.location, ei) or \
+                        si >= ej + travel_slots(G, tj.location, ti.location, ej):
+                    continue
+            if G.time_dependent:
+                # 出发时刻相关的通勤时间：按离开上一个任务的 slot 查表
+                lij = _leg(model, G, ti, tj, ends, pinned, depart)
+                lji = _leg(model, G, tj, ti, ends, pinned, depart)
+            else:
+                lij = travel_slots(G, ti.location, tj.location)
+                lji = travel_slots(G, tj.location, ti.location)
 
             bij = model.NewBoolVar(f"{ti.id}_before_{tj.id}")
             bji = model.NewBoolVar(f"{tj.id}_before_{ti.id}")
+            if hint is not None and ti.id in hint and tj.id in hint:
+                model.AddHint(bij, int(hint[ti.id] < hint[tj.id]))
+                model.AddHint(bji, int(hint[tj.id] < hint[ti.id]))
 
             # 只有两者都被选中时，必须有一个先一个后
             model.Add(bij + bji == 1).OnlyEnforceIf([pres[ti.id], pres[tj.id]])
@@ -94,54 +218,618 @@ def solve_plan(G, tasks_def: List[TaskIn], mode: str = "travel", engine: str = "
                 [pres[tj.id], pres[ti.id], bji]
             )
 
-    # --- 目标函数 ---
-    penalties: list = []
-    if mode == "travel":
 
-        pass
-    elif mode == "preference":
-        for t in tasks_def:
-            if t.prefer_win:
-                for a, b in t.prefer_win:
-                    a_s, b_s = to_slot(a), to_slot(b)
-                    good = model.NewBoolVar(f"pref_{t.id}_{a}_{b}")
-                    # 只有任务存在时才考虑偏好
-                    model.Add(starts[t.id] >= a_s).OnlyEnforceIf([good, pres[t.id]])
-                    model.Add(starts[t.id] <= b_s).OnlyEnforceIf([good, pres[t.id]])
-                    penalties.append(-5 * good)
-    elif mode == "compact":
-        makespan = model.NewIntVar(0, H, "makespan")
-        for t in tasks_def:
-            model.Add(ends[t.id] <= makespan).OnlyEnforceIf(pres[t.id])
-        penalties.append(makespan)
+def _leg(model, G, ta: TaskIn, tb: TaskIn, ends, pinned, depart):
+    """Travel slots from ``ta`` to ``tb``: a constant when ``ta`` is pinned,
+    else looked up by ``ta``'s end slot."""
+    if ta.id in pinned:
+        return travel_slots(G, ta.location, tb.location, pinned[ta.id][1])
+    table = G.departure_table(ta.location, tb.location)
+    index, first, last = depart.get(ta.id, (ends[ta.id], 0, len(table) - 1))
+    leg = model.NewIntVar(0, UNREACHABLE, f"tt_{ta.id}_{tb.id}")
+    model.AddElement(index, table[first:last + 1], leg)
+    return leg
 
-    # base reward: priority
-    for t in tasks_def:
-        penalties.append(-int(t.priority) * pres[t.id])
 
-    if penalties:
-        model.Minimize(sum(penalties))
+def _add_circuit(
+    model,
+    G,
+    tasks_def: List[TaskIn],
+    starts,
+    ends,
+    pres,
+    bounds,
+    hint: Optional[Dict[str, int]] = None,
+    neighbours: Optional[int] = CIRCUIT_NEIGHBOURS,
+) -> list:
+    """Successor model: one ``AddCircuit`` over a depot (node 0) and the tasks.
 
-    # --- 求解 (CP‑SAT) ---
-    solver = cp_model.CpSolver()
-    solver.parameters.max_time_in_seconds = 5
-    status = solver.Solve(model)
+    Arc ``i -> j`` means ``j`` directly follows ``i``; absent tasks take
+    their self-loop.  Arcs that no start/end window can satisfy are never
+    created.  With ``neighbours`` set, an arc is kept only if it is among
+    the ``neighbours`` soonest successors of its tail or the ``neighbours``
+    best predecessors of its head -- a granular neighbourhood that makes
+    the arc count linear but can still cut off optimal tours, so the
+    default (``None``) keeps every feasible arc.  Each arc carries a
+    single precedence constraint plus its travel as an objective cost;
+    the costs are returned.
+    """
+    locs = sorted({t.location for t in tasks_def})
+    loc_ix = {loc: k for k, loc in enumerate(locs)}
+    table = travel_tables(G, locs)
+    H = table.shape[2] - 1
 
-    items = []
-    if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
-        for t in tasks_def:
-            if solver.Value(pres[t.id]):
-                s = solver.Value(starts[t.id])
-                e = solver.Value(ends[t.id])
-                items.append(
-                    {
-                        "id": t.id,
-                        "title": t.title,
-                        "loc": t.location,
-                        "start": slot_to_hhmm(s),
-                        "end": slot_to_hhmm(e),
-                    }
-                )
+    # hinted successor of each task; "" stands for the depot
+    seq = sorted(hint, key=hint.get) if hint else []
+    succ = dict(zip([""] + seq, seq + [""]))
+
+    arcs = [(0, 0, model.NewBoolVar("empty_day"))]
+    for i, t in enumerate(tasks_def, start=1):
+        arcs.append((0, i, model.NewBoolVar(f"first_{t.id}")))
+        arcs.append((i, 0, model.NewBoolVar(f"last_{t.id}")))
+        arcs.append((i, i, pres[t.id].Not()))
+    if hint is not None:
+        for a, b, lit in arcs:
+            if a != b:
+                model.AddHint(lit, int(succ.get(tasks_def[a - 1].id if a else "") == (tasks_def[b - 1].id if b else "")))
+        model.AddHint(arcs[0][2], int(not seq))
 
+    n = len(tasks_def)
+    cands = []  # (earliest start of tj after ti, i, j, ti, tj, row, lo, hi)
+    for i, ti in enumerate(tasks_def, start=1):
+        dur, s_lb, s_ub = bounds[ti.id]
+        e_lo, e_hi = min(s_lb + dur, H), min(s_ub + dur, H)
+        for j, tj in enumerate(tasks_def, start=1):
+            if i == j:
+                continue
+            row = table[loc_ix[ti.location], loc_ix[tj.location]]
+            seg = row[e_lo:e_hi + 1]
+            lo, hi = int(seg.min()), int(seg.max())
+            if lo >= UNREACHABLE or s_lb + dur + lo > bounds[tj.id][2]:
+                continue  # tj can never directly follow ti
+            cands.append((max(bounds[tj.id][1], s_lb + dur + lo), i, j, ti, tj, row, lo, hi))
+
+    if neighbours is not None:
+        # Each task keeps its best successors *and* predecessors, so pruning
+        # never strips a task's last incoming arc; ties (same location and
+        # window) rotate by index so equal tasks form a chain instead of all
+        # pointing at the first few.  The hinted successor is always kept so
+        # the hint stays a complete tour.
+        out: Dict[int, list] = {}
+        inc: Dict[int, list] = {}
+        for c in cands:
+            out.setdefault(c[1], []).append(c)
+            inc.setdefault(c[2], []).append(c)
+        keep = set()
+        for i, row_c in out.items():
+            hinted = succ.get(row_c[0][3].id)
+            row_c.sort(key=lambda c: (c[4].id != hinted, c[0], (c[2] - i) % n))
+            keep.update((c[1], c[2]) for c in row_c[:neighbours])
+        for j, col_c in inc.items():
+            col_c.sort(key=lambda c: (c[0], (j - c[1]) % n))
+            keep.update((c[1], c[2]) for c in col_c[:neighbours])
+        cands = [c for c in cands if (c[1], c[2]) in keep]
+
+    costs: list = []
+    for _, i, j, ti, tj, row, lo, hi in cands:
+        x = model.NewBoolVar(f"{ti.id}_then_{tj.id}")
+        arcs.append((i, j, x))
+        if hint is not None:
+            model.AddHint(x, int(succ.get(ti.id) == tj.id))
+        if lo == hi:
+            model.Add(starts[tj.id] >= ends[ti.id] + lo).OnlyEnforceIf(x)
+            if lo:
+                costs.append(lo * x)
+        else:
+            # 出发时刻相关：按离开 ti 的 slot 查表
+            leg = model.NewIntVar(lo, hi, f"tt_{ti.id}_{tj.id}")
+            model.AddElement(ends[ti.id], row.tolist(), leg)
+            model.Add(starts[tj.id] >= ends[ti.id] + leg).OnlyEnforceIf(x)
+            cost = model.NewIntVar(0, hi, f"tc_{ti.id}_{tj.id}")
+            model.Add(cost == leg).OnlyEnforceIf(x)
+            model.Add(cost == 0).OnlyEnforceIf(x.Not())
+            costs.append(cost)
+
+    model.AddCircuit(arcs)
+    return costs
+
+
+# on_solution(items, objective, bound) for streamed CP-SAT solutions
+OnSolution = Callable[[List[Dict[str, str]], float, float], None]
+
+
+def _read_items(value, tasks_def: List[TaskIn], starts, ends, pres) -> List[Dict[str, str]]:
+    """Planner items of the present tasks, sorted by start; ``value`` is
+    ``CpSolver.Value`` or a solution callback's ``Value``."""
+    items = []
+    for t in tasks_def:
+        if value(pres[t.id]):
+            items.append(
+                {
+                    "id": t.id,
+                    "title": t.title,
+                    "loc": t.location,
+                    "start": slot_to_hhmm(value(starts[t.id])),
+                    "end": slot_to_hhmm(value(ends[t.id])),
+                }
+            )
     items.sort(key=lambda x: x["start"])
     return items
+
+
+class _SolutionStream(cp_model.CpSolverSolutionCallback):
+    """Hands every improving CP-SAT solution to ``emit``."""
+
+    def __init__(self, tasks_def, starts, ends, pres, emit: OnSolution, stop: Optional[threading.Event] = None):
+        super().__init__()
+        self.tasks, self.starts, self.ends, self.pres = tasks_def, starts, ends, pres
+        self.emit = emit
+        self.stop = stop
+
+    def on_solution_callback(self) -> None:
+        self.emit(
+            _read_items(self.Value, self.tasks, self.starts, self.ends, self.pres),
+            self.ObjectiveValue(),
+            self.BestObjectiveBound(),
+        )
+        if self.stop is not None and self.stop.is_set():
+            self.StopSearch()
+
+
+class PlanningSession:
+    """One CP-SAT model for a task list, solved under several objectives.
+
+    Variables, windows, NoOverlap and the travel sequencing structure are
+    built once (see :func:`_build_cp_model`); :meth:`solve` clones the
+    model proto and only sets the objective of the requested mode, so the
+    planner's three modes share one build and can run side by side.
+
+    With ``decompose`` the tasks are first split by
+    :func:`split_components` and each component gets its own model; they
+    are solved concurrently and their schedules merged.  Priority and
+    preference terms split exactly; travel between components is then
+    only optimised within each component.  The "compact" makespan does
+    not split at all, so that mode always solves one undecomposed model
+    (built on first use).
+    """
+
+    def __init__(
+        self,
+        G,
+        tasks_def: List[TaskIn],
+        formulation: str = "pairwise",
+        warm_start: bool = False,
+        hint_mode: str = "travel",
+        decompose: Optional[bool] = None,
+        hint: Optional[Dict[str, int]] = None,
+    ) -> None:
+        """
+        :param formulation: ``"pairwise"`` or ``"circuit"``, see :func:`solve_plan`
+        :param warm_start: hint the model with the hybrid greedy schedule
+            for ``hint_mode``
+        :param decompose: one model per independent component
+            (``settings.SOLVER_DECOMPOSE`` when ``None``)
+        :param hint: explicit start-slot hints by task id (e.g. a previous
+            plan); takes precedence over ``warm_start``
+        """
+        self.tasks = resolve_tasks(G, tasks_def)
+        if hint is None and warm_start:
+            hint = _warm_start(G, self.tasks, hint_mode)
+        if decompose is None:
+            decompose = settings.SOLVER_DECOMPOSE
+        groups = split_components(G, self.tasks) if decompose and len(self.tasks) > 1 else [self.tasks]
+        if len(groups) > 1:
+            print(f"[DECOMPOSE] {len(self.tasks)} tasks -> components {[len(g) for g in groups]}")  # << LOG
+        # (tasks, model, starts, ends, pres, objectives) per component
+        self.parts = []
+        for group in groups:
+            part_hint = None if hint is None else {t.id: hint[t.id] for t in group if t.id in hint}
+            self.parts.append((group, *_build_cp_model(G, group, formulation, part_hint)))
+        # undecomposed model for "compact"; the single part when not split
+        self._whole = self.parts[0] if len(self.parts) == 1 else None
+        self._whole_args = (G, formulation, hint)
+        self._whole_lock = threading.Lock()
+
+    def _whole_part(self):
+        with self._whole_lock:
+            if self._whole is None:
+                G, formulation, hint = self._whole_args
+                self._whole = (self.tasks, *_build_cp_model(G, self.tasks, formulation, hint))
+            return self._whole
+
+    def solve(
+        self,
+        mode: str = "travel",
+        on_solution: Optional[OnSolution] = None,
+        stop: Optional[threading.Event] = None,
+        share: int = 1,
+        **limits,
+    ) -> List[Dict[str, str]]:
+        """Schedule for ``mode``; ``limits`` are ``time_budget``,
+        ``workers`` and ``relative_gap`` as in :func:`solve_plan`.
+        ``share`` is the number of solves running alongside this one
+        (parallel modes); each component asks for at most its fair part
+        of the core quota.
+
+        ``on_solution(items, objective, bound)`` is called from the solver
+        thread for every improving schedule; with several components it
+        fires once each has a solution, with the merged schedule and the
+        summed objective/bound.  Setting ``stop`` ends the search at the
+        next solution.
+        """
+        if mode == "compact":
+            return self._solve_part(self._whole_part(), mode, on_solution=on_solution, stop=stop, share=share, **limits)
+        if len(self.parts) == 1:
+            return self._solve_part(self.parts[0], mode, on_solution=on_solution, stop=stop, share=share, **limits)
+        emits = [None] * len(self.parts)
+        if on_solution is not None:
+            latest = [None] * len(self.parts)
+            lock = threading.Lock()
+
+            def merged(k, items, objective, bound):
+                with lock:
+                    latest[k] = (items, objective, bound)
+                    if any(x is None for x in latest):
+                        return
+                    all_items = sorted((it for x in latest for it in x[0]), key=lambda x: x["start"])
+                    on_solution(all_items, sum(x[1] for x in latest), sum(x[2] for x in latest))
+
+            emits = [partial(merged, k) for k in range(len(self.parts))]
+        with ThreadPoolExecutor(max_workers=len(self.parts)) as ex:
+            results = list(ex.map(
+                lambda k: self._solve_part(
+                    self.parts[k], mode, on_solution=emits[k], stop=stop, share=share * len(self.parts), **limits
+                ),
+                range(len(self.parts)),
+            ))
+        items = [it for r in results for it in r]
+        items.sort(key=lambda x: x["start"])
+        return items
+
+    def _solve_part(
+        self,
+        part,
+        mode: str,
+        time_budget: Optional[float] = None,
+        workers: Optional[int] = None,
+        relative_gap: Optional[float] = None,
+        on_solution: Optional[OnSolution] = None,
+        stop: Optional[threading.Event] = None,
+        share: int = 1,
+    ) -> List[Dict[str, str]]:
+        tasks, base, starts, ends, pres, objectives = part
+        model = base.Clone()
+        model.Minimize(objectives.get(mode, objectives["travel"]))
+
+        # client limits are capped server-side; waiting for cores counts
+        # against the budget
+        budget = settings.CP_TIME_LIMIT if time_budget is None else time_budget
+        budget = min(budget, settings.CP_MAX_TIME_LIMIT)
+        gap = settings.CP_RELATIVE_GAP if relative_gap is None else relative_gap
+        wanted = min(workers or settings.CP_WORKERS, max(1, core_quota.total // share))
+        solver = cp_model.CpSolver()
+        if gap:
+            solver.parameters.relative_gap_limit = gap
+        t0 = time.perf_counter()
+        with core_quota.reserve(wanted, timeout=budget) as granted:
+            solver.parameters.max_time_in_seconds = max(0.05, budget - (time.perf_counter() - t0))
+            solver.parameters.num_workers = granted
+            if on_solution is None:
+                status = solver.Solve(model)
+            else:
+                status = solver.Solve(model, _SolutionStream(tasks, starts, ends, pres, on_solution, stop))
+
+        if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            return _read_items(solver.Value, tasks, starts, ends, pres)
+        return []
+
+    def solve_all(self, modes: List[str], parallel: bool = False, **limits) -> List[List[Dict[str, str]]]:
+        """:meth:`solve` for each of ``modes``, in order; with ``parallel``
+        the solves run concurrently (CP-SAT releases the GIL) and share
+        the server core quota."""
+        if not parallel or len(modes) < 2:
+            return [self.solve(m, **limits) for m in modes]
+        with ThreadPoolExecutor(max_workers=len(modes)) as ex:
+            return list(ex.map(lambda m: self.solve(m, share=len(modes), **limits), modes))
+
+    def stream(self, modes: List[str], parallel: bool = False, **limits) -> Iterator[Dict]:
+        """Solve ``modes`` in the background and yield events as they come:
+
+        * ``{"event": "solution", "mode", "objective", "bound", "elapsed", "items"}``
+          for every improving schedule,
+        * ``{"event": "final", "mode", "elapsed", "items"}`` once a mode is done,
+        * ``{"event": "error", "mode", "detail"}`` if its solve failed.
+
+        Closing the generator early (client went away) asks the running
+        solves to stop at their next solution.
+        """
+        events: "queue.Queue[Dict]" = queue.Queue()
+        stop = threading.Event()
+        t0 = time.perf_counter()
+
+        def run(mode):
+            def emit(items, objective, bound):
+                events.put({
+                    "event": "solution", "mode": mode, "objective": objective, "bound": bound,
+                    "elapsed": round(time.perf_counter() - t0, 3), "items": items,
+                })
+
+            try:
+                items = self.solve(mode, on_solution=emit, stop=stop, share=len(modes) if parallel else 1, **limits)
+                events.put({"event": "final", "mode": mode, "elapsed": round(time.perf_counter() - t0, 3), "items": items})
+            except Exception as e:
+                events.put({"event": "error", "mode": mode, "detail": str(e)})
+
+        ex = ThreadPoolExecutor(max_workers=len(modes) if parallel else 1)
+        for m in modes:
+            ex.submit(run, m)
+        ex.shutdown(wait=False)
+        pending = len(modes)
+        try:
+            while pending:
+                ev = events.get()
+                if ev["event"] != "solution":
+                    pending -= 1
+                yield ev
+        finally:
+            stop.set()
+
+
+def _warm_start(G, tasks_def: List[TaskIn], mode: str) -> Dict[str, int]:
+    """Start slots of the hybrid greedy schedule (plus its steepest-descent
+    polish), used as CP-SAT hints."""
+    from .hybrid_solver import HybridScheduler
+    hs = HybridScheduler(travel_fn=travel_slots, mode=mode, table_fn=travel_tables, max_iterations=0)
+    return {it["id"]: to_slot(it["start"]) for it in hs.solve(G, tasks_def)}
+
+
+def solve_plan(
+    G,
+    tasks_def: List[TaskIn],
+    mode: str = "travel",
+    engine: str = "cp",
+    time_budget: Optional[float] = None,
+    max_iterations: Optional[int] = None,
+    seed: int = 42,
+    restarts: int = 1,
+    cp_formulation: str = "pairwise",
+    workers: Optional[int] = None,
+    relative_gap: Optional[float] = None,
+    warm_start: bool = False,
+    decompose: Optional[bool] = None,
+    cache: bool = True,
+    hint: Optional[Dict[str, int]] = None,
+):
+    """Plan a list of tasks using either CP‑SAT or a custom hybrid solver.
+
+    :param G: the travel graph instance
+    :param tasks_def: list of tasks to schedule
+    :param mode: objective mode; one of ``"travel"``, ``"preference"``, ``"compact"``
+    :param engine: solver backend; ``"cp"`` (default) uses OR‑Tools CP‑SAT,
+        ``"hybrid"`` uses a custom greedy/local search solver defined in
+        :mod:`app.services.hybrid_solver`.  Additional values fall back to
+        ``"cp"``.
+    :param time_budget: wall-clock seconds; for the hybrid engine the local
+        search budget, after which the best schedule found so far is
+        returned, for CP the solver time limit (``settings.CP_TIME_LIMIT``
+        when ``None``)
+    :param max_iterations: hybrid engine only; local-search iteration cap
+    :param seed: hybrid engine only; base RNG seed
+    :param restarts: hybrid engine only; independent starts (seeds
+        ``seed .. seed + restarts - 1``) run on the shared process pool,
+        cheapest wins
+    :param cp_formulation: CP engine only; ``"pairwise"`` (default) orders
+        every task pair with reified booleans, ``"circuit"`` sequences the
+        tasks with one ``AddCircuit`` and breaks ties by total travel;
+        it builds a little faster but, per ``benchmarks/bench_cp_models.py``,
+        finds worse plans than pairwise once task lists grow
+    :param workers: CP engine only; CP-SAT workers wanted
+        (``settings.CP_WORKERS`` when ``None``); the grant is capped by
+        what is left of the server-wide core quota
+    :param relative_gap: CP engine only; stop once within this relative
+        gap of the bound (``settings.CP_RELATIVE_GAP`` when ``None``)
+    :param warm_start: CP engine only; run the hybrid greedy first and
+        hint CP-SAT with its schedule; its time comes out of the budget
+    :param decompose: split the tasks into independent components
+        (:func:`split_components`) and solve them separately; CP
+        components run concurrently, hybrid ones in-process sharing the
+        budget (``settings.SOLVER_DECOMPOSE`` when ``None``); ignored for
+        ``"compact"``, whose makespan spans every component
+    :param cache: serve identical requests (same normalised tasks, options
+        and travel version) from :data:`~app.services.plan_cache.plan_cache`
+        and coalesce concurrent ones into a single solve
+    :param hint: CP engine only; start slots by task id to hint CP-SAT
+        with (see :func:`repair_plan`)
+
+    The return value is a list of dicts each with ``id``, ``title``,
+    ``loc``, ``start`` and ``end`` keys where ``start`` and ``end`` are
+    ``HH:MM`` formatted strings.  This signature is backwards
+    compatible with earlier versions; callers that ignore the
+    ``engine`` parameter will continue to use the CP based solver.
+    """
+
+    if decompose is None:
+        decompose = settings.SOLVER_DECOMPOSE
+    if cache and plan_cache.enabled:
+        options = dict(
+            mode=mode, engine=engine, time_budget=time_budget, max_iterations=max_iterations, seed=seed,
+            restarts=restarts, cp_formulation=cp_formulation, workers=workers, relative_gap=relative_gap,
+            warm_start=warm_start, decompose=decompose, hint=hint,
+        )
+        key = plan_key(G, tasks_def, **options)
+        return plan_cache.get_or_solve(key, partial(solve_plan, G, tasks_def, cache=False, **options))
+
+    # Snap free-text locations ("com 1", "central lib") onto travel nodes.
+    tasks_def = resolve_tasks(G, tasks_def)
+
+    # If the hybrid engine is requested, delegate to the custom solver.
+    if engine == "hybrid":
+        # the makespan of "compact" does not split across components
+        if decompose and mode != "compact" and len(tasks_def) > 1:
+            groups = split_components(G, tasks_def)
+            if len(groups) > 1:
+                print(f"[DECOMPOSE] {len(tasks_def)} tasks -> components {[len(g) for g in groups]}")  # << LOG
+                # Components run in-process one after another and share the
+                # budget by size; with restarts > 1 each one's starts use
+                # the pool as usual.
+                items = []
+                for g in groups:
+                    items += solve_plan(
+                        G, g, mode=mode, engine=engine, max_iterations=max_iterations, seed=seed,
+                        time_budget=None if time_budget is None else time_budget * len(g) / len(tasks_def),
+                        restarts=restarts, decompose=False, cache=False,
+                    )
+                items.sort(key=lambda x: x["start"])
+                return items
+
+        # Import lazily to avoid pulling in heavy modules on CP code path
+        from .hybrid_solver import HybridScheduler
+        # Instantiate solver with the travel time callback and mode
+        hs = HybridScheduler(
+            travel_fn=travel_slots,
+            mode=mode,
+            table_fn=travel_tables,
+            time_budget=time_budget,
+            max_iterations=max_iterations,
+            seed=seed,
+            restarts=restarts,
+        )
+        return hs.solve(G, tasks_def)
+
+
+    # --- 求解 (CP‑SAT) ---
+    t0 = time.perf_counter()
+    session = PlanningSession(
+        G, tasks_def, cp_formulation, warm_start=warm_start, hint_mode=mode,
+        decompose=decompose and mode != "compact", hint=hint,
+    )
+    budget = settings.CP_TIME_LIMIT if time_budget is None else time_budget
+    return session.solve(
+        mode, time_budget=budget - (time.perf_counter() - t0), workers=workers, relative_gap=relative_gap
+    )
+
+
+def repair_plan(
+    G,
+    tasks_def: List[TaskIn],
+    previous: List[Dict[str, str]],
+    changed: List[str],
+    mode: str = "travel",
+    engine: str = "cp",
+    cp_formulation: str = "pairwise",
+    time_budget: Optional[float] = None,
+    radius_min: Optional[int] = None,
+) -> Tuple[List[Dict[str, str]], bool]:
+    """Repair ``previous`` after an edit instead of planning from scratch.
+
+    ``tasks_def`` is the edited task list and ``changed`` the ids that were
+    added or moved; tasks of ``previous`` missing from ``tasks_def`` count
+    as removed.  The edit frees the new windows of the changed tasks and
+    the old slots of moved/removed ones, the latter widened by
+    ``radius_min`` (``settings.REPLAN_RADIUS_MIN``).  Previous items
+    overlapping a freed range are re-planned within those ranges (hinted
+    at their old start for CP), as are unplaced tasks whose window meets
+    one; every other item is pinned to its old slot as a fixed task.  The
+    small residual problem goes through :func:`solve_plan` with
+    ``time_budget`` (``settings.REPLAN_TIME_BUDGET``).
+
+    If that finds nothing, the previous plan minus the removed tasks is
+    returned when it still fits the travel times -- moved tasks stay at
+    their old slot where it fits their new window, added ones are left
+    out; otherwise the whole list is planned again, hinted with the
+    previous plan, within the same budget.
+
+    Returns ``(items, repaired)``; ``repaired`` is ``False`` when one of
+    those fallbacks produced ``items``, so the caller can tell the user
+    the edit was not applied as asked.
+    """
+    tasks_def = resolve_tasks(G, tasks_def)
+    budget = settings.REPLAN_TIME_BUDGET if time_budget is None else time_budget
+    pad = ceil((settings.REPLAN_RADIUS_MIN if radius_min is None else radius_min) / SLOT_MIN)
+    by_id = {t.id: t for t in tasks_def}
+    prev = {it["id"]: (to_slot(it["start"]), to_slot(it["end"])) for it in previous}
+    changed = set(changed)
+
+    # freed ranges, in slots
+    freed = []
+    for tid in changed:
+        t = by_id.get(tid)
+        if t is not None:
+            freed.append((to_slot(t.earliest), to_slot(t.latest) + ceil(t.duration_min / SLOT_MIN)))
+    for tid, (a, b) in prev.items():
+        if tid in changed or tid not in by_id:
+            freed.append((a - pad, b + pad))
+
+    def around(t: TaskIn, a: int, b: int) -> Optional[TaskIn]:
+        """``t`` with its window cut to the freed ranges overlapping
+        ``[a, b)`` (and its old start), or ``None`` if there are none."""
+        hit = [(fa, fb) for fa, fb in freed if a < fb and fa < b]
+        if not hit:
+            return None
+        lo, hi = min(fa for fa, _ in hit), max(fb for _, fb in hit)
+        if t.id in prev:
+            lo, hi = min(lo, prev[t.id][0]), max(hi, prev[t.id][0])
+        lo, hi = max(lo, to_slot(t.earliest), 0), min(hi, to_slot(t.latest))
+        if lo > hi:
+            return None
+        return t.model_copy(update={"earliest": slot_to_hhmm(lo), "latest": slot_to_hhmm(hi)})
+
+    sub, pinned, hint = [], set(), {}
+    for t in tasks_def:
+        if t.id in changed:
+            # left unhinted (= hinted absent): its old slot may not fit the
+            # edit, and the rest of the hint stays a feasible schedule
+            sub.append(t)
+        elif t.id in prev:
+            s, e = prev[t.id]
+            near = around(t, s, e)
+            if near is not None:
+                sub.append(near)
+                hint[t.id] = s
+            else:
+                start = slot_to_hhmm(s)
+                sub.append(t.model_copy(update={"earliest": start, "latest": start, "fixed": True}))
+                pinned.add(t.id)
+                hint[t.id] = s
+        else:
+            near = around(t, to_slot(t.earliest), to_slot(t.latest) + ceil(t.duration_min / SLOT_MIN))
+            if near is not None:
+                sub.append(near)
+
+    print(f"[REPLAN] {len(tasks_def)} tasks: {len(sub) - len(pinned)} free, {len(pinned)} pinned")  # << LOG
+    items = solve_plan(
+        G, sub, mode=mode, engine=engine, time_budget=budget, cp_formulation=cp_formulation,
+        hint=hint if engine == "cp" else None, decompose=engine == "cp",
+    )
+    if pinned <= {it["id"] for it in items} and (items or not sub):
+        return items, True
+
+    def item(tid: str, s: int, dur: int) -> Dict[str, str]:
+        t = by_id[tid]
+        return {"id": tid, "title": t.title, "loc": t.location, "start": slot_to_hhmm(s), "end": slot_to_hhmm(s + dur)}
+
+    def fits(plan: List[Dict[str, str]]) -> bool:
+        return all(
+            to_slot(b["start"]) >= to_slot(a["end"]) + travel_slots(G, a["loc"], b["loc"], to_slot(a["end"]))
+            for a, b in zip(plan, plan[1:])
+        )
+
+    # the hint is the previous plan without the changed/removed tasks
+    kept = sorted((item(tid, s, prev[tid][1] - prev[tid][0]) for tid, s in hint.items()), key=lambda x: x["start"])
+    if fits(kept):
+        # moved tasks whose old slot still lies in their new window stay put
+        H = int((DAY_END - DAY_START).total_seconds() // 60 // SLOT_MIN)
+        for tid in sorted(changed & prev.keys() & by_id.keys(), key=lambda tid: prev[tid][0]):
+            t, s = by_id[tid], prev[tid][0]
+            dur = ceil(t.duration_min / SLOT_MIN)
+            if to_slot(t.earliest) <= s <= to_slot(t.latest) and s + dur <= H:
+                plan = sorted(kept + [item(tid, s, dur)], key=lambda x: x["start"])
+                if fits(plan):
+                    kept = plan
+        print(f"[REPLAN] no repair within budget, keeping the previous plan ({len(kept)} items)")  # << LOG
+        return kept, False
+    print("[REPLAN] previous plan no longer fits, planning again")  # << LOG
+    return solve_plan(
+        G, tasks_def, mode=mode, engine=engine, time_budget=budget, cp_formulation=cp_formulation,
+        hint={tid: s for tid, (s, _) in prev.items() if tid in by_id and tid not in changed} if engine == "cp" else None,
+    ), False
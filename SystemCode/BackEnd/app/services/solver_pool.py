@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from ..core.config import settings
+
+
+# One process pool for the whole server.  Workers are started on first use
+# and then reused by every request, so a multi-start solve only pays for
+# pickling its inputs, not for starting processes.  They come from a
+# forkserver: forking the threaded server process directly (CP-SAT and
+# threadpool threads) could copy held locks into the children.
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def pool_size() -> int:
+    return max(1, settings.SOLVER_POOL_WORKERS or os.cpu_count() or 1)
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=pool_size(), mp_context=multiprocessing.get_context("forkserver")
+            )
+            print(f"[POOL] started solver pool with {pool_size()} workers")  # << LOG
+        return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+class CoreQuota:
+    """Server-wide budget of cores for CP-SAT workers.
+
+    :meth:`reserve` grants up to the wanted number of cores from what is
+    free (at least one, waiting while none is) and returns them when the
+    solve ends, so concurrent requests cannot oversubscribe the machine.
+    With a ``timeout`` the wait is bounded: once it expires the solve runs
+    on one core outside the quota rather than stall its request.
+    """
+
+    def __init__(self, total: int) -> None:
+        self.total = max(1, total)
+        self.free = self.total
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def reserve(self, wanted: int, timeout: Optional[float] = None) -> Iterator[int]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self.free < 1:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    print("[POOL] core quota exhausted, running on one core over quota")  # << LOG
+                    break
+                self._cond.wait(remaining)
+            granted = max(0, min(wanted, self.free))
+            self.free -= granted
+        try:
+            yield max(1, granted)
+        finally:
+            with self._cond:
+                self.free += granted
+                self._cond.notify_all()
+
+
+core_quota = CoreQuota(settings.CP_CORE_QUOTA or os.cpu_count() or 1)
@@ -1,56 +1,509 @@
-import math
-import networkx as nx
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+import numpy as np
 import pandas as pd
-from sqlalchemy import text
+from sqlalchemy import inspect, text
 from ..db.session import get_engine
-from ..core.constants import SLOT_MIN
+from ..core.config import settings
+from ..core.constants import DAY_START, DAY_END, SLOT_MIN
+from ..utils.timeutils import to_slot
 
 
+# Cost (in slots) reported for pairs that have no path between them.
+UNREACHABLE = 9999
 
+# Planning horizon in slots; departure-slot lookups cover 0..HORIZON.
+HORIZON = int((DAY_END - DAY_START).total_seconds() // 60 // SLOT_MIN)
 
-def _build_graph(df: pd.DataFrame) -> nx.DiGraph:
-    G = nx.DiGraph()
-    for _, r in df.iterrows():
-        minutes = int(r["minutes"])
-        slots = math.ceil(minutes / SLOT_MIN)
-        G.add_edge(r["loc_from"], r["loc_to"], minutes=minutes, slots=slots)
-    return G
+# Optional table of time-of-day overrides: same columns as travel_times
+# plus ``depart_from`` / ``depart_to`` ("HH:MM", end exclusive).
+WINDOWS_TABLE = "travel_time_windows"
 
 
+# Per-pair mode codes stored in ``TravelMatrix.mode``.  ``MIXED`` marks a
+# best route that changes mode along the way; ``NO_MODE`` marks pairs
+# without a route (and the diagonal).
+LEG_MODES = ("walk", "bus", "mixed")
+MIXED = 2
+NO_MODE = -1
 
 
-def load_travel_graph(commute_mode: str = "bus") -> nx.DiGraph:
-    eng = get_engine()
-    if commute_mode in ("bus", "transit"):
-        df = pd.read_sql(text("SELECT loc_from, loc_to, minutes FROM travel_times WHERE mode='bus'"), eng)
-        return _build_graph(df)
-    elif commute_mode == "walk":
-        df = pd.read_sql(text("SELECT loc_from, loc_to, minutes FROM travel_times WHERE mode='walk'"), eng)
-        return _build_graph(df)
-    elif commute_mode == "auto":
-        df = pd.read_sql(
+class TravelMatrix:
+    """Travel graph for one commute mode, stored as all-pairs shortest
+    travel times (in slots).
+
+    ``dist[index[a], index[b]]`` is the shortest path length from ``a`` to
+    ``b``; pairs without a path hold :data:`UNREACHABLE`.  ``next_hop``
+    holds the index of the first stop after ``a`` on that path and
+    ``mode`` the code (see :data:`LEG_MODES`) of the mode(s) it uses.
+
+    Time-of-day costs live in ``bucket_dist[slot_bucket[depart], i, j]``:
+    ``slot_bucket`` maps each departure slot of the day onto one of the
+    ``bucket_dist`` layers.  Without overrides there is a single layer
+    equal to ``dist``.  Routes (``next_hop``/``mode``) follow ``dist``.
+    ``commute`` is the normalised commute mode the matrix was built for.
+    """
+
+    __slots__ = ("nodes", "index", "dist", "next_hop", "mode", "bucket_dist", "slot_bucket", "version", "commute")
+
+    # Array attributes written to / mapped from a snapshot.
+    ARRAYS = ("dist", "next_hop", "mode", "bucket_dist", "slot_bucket")
+
+    def __init__(
+        self,
+        nodes: List[str],
+        dist: np.ndarray,
+        next_hop: np.ndarray,
+        mode: np.ndarray,
+        bucket_dist: Optional[np.ndarray] = None,
+        slot_bucket: Optional[np.ndarray] = None,
+        version: str = "",
+        commute: str = "",
+    ) -> None:
+        self.nodes = nodes
+        self.index: Dict[str, int] = {n: i for i, n in enumerate(nodes)}
+        self.dist = dist
+        self.next_hop = next_hop
+        self.mode = mode
+        self.bucket_dist = dist[None] if bucket_dist is None else bucket_dist
+        self.slot_bucket = np.zeros(HORIZON + 1, dtype=np.int16) if slot_bucket is None else slot_bucket
+        self.version = version
+        self.commute = commute
+
+    @property
+    def time_dependent(self) -> bool:
+        return len(self.bucket_dist) > 1
+
+    def slots(self, a: str, b: str) -> int:
+        if a == b:
+            return 0
+        i = self.index.get(a)
+        j = self.index.get(b)
+        if i is None or j is None:
+            return UNREACHABLE
+        return int(self.dist[i, j])
+
+    def slots_at(self, a: str, b: str, depart: int) -> int:
+        """Like :meth:`slots`, for a trip leaving at slot ``depart``."""
+        if a == b:
+            return 0
+        i = self.index.get(a)
+        j = self.index.get(b)
+        if i is None or j is None:
+            return UNREACHABLE
+        bucket = self.slot_bucket[min(max(depart, 0), HORIZON)]
+        return int(self.bucket_dist[bucket, i, j])
+
+    def departure_table(self, a: str, b: str) -> List[int]:
+        """Cost from ``a`` to ``b`` for every departure slot ``0..HORIZON``."""
+        if a == b:
+            return [0] * (HORIZON + 1)
+        i = self.index.get(a)
+        j = self.index.get(b)
+        if i is None or j is None:
+            return [UNREACHABLE] * (HORIZON + 1)
+        return self.bucket_dist[:, i, j][self.slot_bucket].tolist()
+
+    def _gather(self, table: np.ndarray, locs: List[str]) -> np.ndarray:
+        """``table[..., locs, locs]`` with unknown locations unreachable and
+        repeated/identical locations free, as in :meth:`slots`."""
+        idx = np.array([self.index.get(loc, -1) for loc in locs], dtype=np.int64)
+        known = np.flatnonzero(idx >= 0)
+        out = np.full(table.shape[:-2] + (len(locs), len(locs)), UNREACHABLE, dtype=np.int32)
+        out[..., known[:, None], known[None, :]] = table[..., idx[known][:, None], idx[known][None, :]]
+        names = np.array(locs, dtype=object)
+        out[..., names[:, None] == names[None, :]] = 0
+        return out
+
+    def sub_matrix(self, locs: List[str]) -> np.ndarray:
+        """``len(locs) x len(locs)`` slot matrix for ``locs`` in one gather;
+        unknown locations are unreachable from/to everything else."""
+        return self._gather(self.dist, locs)
+
+    def departure_tables(self, locs: List[str]) -> np.ndarray:
+        """``[from, to, departure slot]`` costs between ``locs`` for every
+        departure slot ``0..HORIZON``."""
+        layers = self._gather(self.bucket_dist, locs)  # [bucket, from, to]
+        return np.ascontiguousarray(layers[self.slot_bucket].transpose(1, 2, 0))
+
+    def leg_mode(self, a: str, b: str) -> Optional[str]:
+        """``"walk"``, ``"bus"`` or ``"mixed"`` for the best route from ``a``
+        to ``b``; ``None`` when there is none or ``a == b``."""
+        i = self.index.get(a)
+        j = self.index.get(b)
+        if i is None or j is None:
+            return None
+        code = int(self.mode[i, j])
+        return LEG_MODES[code] if code != NO_MODE else None
+
+    def path(self, a: str, b: str) -> List[str]:
+        """Stops of the best route from ``a`` to ``b``, both ends included;
+        empty when there is no route."""
+        if a == b:
+            return [a]
+        i = self.index.get(a)
+        j = self.index.get(b)
+        if i is None or j is None or self.dist[i, j] >= UNREACHABLE:
+            return []
+        stops = [a]
+        while i != j:
+            i = int(self.next_hop[i, j])
+            stops.append(self.nodes[i])
+        return stops
+
+
+def _adjacency(
+    df: pd.DataFrame, nodes: Optional[List[str]] = None
+) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    """Dense slot-weighted adjacency built column-wise from the edge table.
+
+    Parallel edges (e.g. a walk and a bus row for the same pair) keep the
+    cheapest one, and the returned mode matrix records which it was.
+    Missing edges hold :data:`UNREACHABLE` / :data:`NO_MODE`.  Pass
+    ``nodes`` to index several tables against the same location list.
+    """
+    ends = pd.concat([df["loc_from"], df["loc_to"]], ignore_index=True)
+    if nodes is None:
+        codes, uniques = pd.factorize(ends)
+        nodes = [str(u) for u in uniques]
+    else:
+        codes = pd.Categorical(ends, categories=nodes).codes.astype(np.int64)
+    n, m = len(nodes), len(df)
+    src, dst = codes[:m], codes[m:]
+    minutes = df["minutes"].to_numpy(dtype=np.int64)
+    modes = pd.Categorical(df["mode"], categories=LEG_MODES[:MIXED]).codes.astype(np.int8)
+
+    # Sort by (pair, minutes, mode) and keep the first row of every pair.
+    pair = src.astype(np.int64) * n + dst
+    order = np.lexsort((modes, minutes, pair))
+    pair = pair[order]
+    first = np.ones(len(pair), dtype=bool)
+    first[1:] = pair[1:] != pair[:-1]
+    order = order[first]
+
+    adj = np.full((n, n), UNREACHABLE, dtype=np.int64)
+    adj_mode = np.full((n, n), NO_MODE, dtype=np.int8)
+    adj[src[order], dst[order]] = -(-minutes[order] // SLOT_MIN)  # ceil without going through floats
+    adj_mode[src[order], dst[order]] = modes[order]
+    return nodes, adj, adj_mode
+
+
+def _all_pairs(adj: np.ndarray, adj_mode: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Floyd–Warshall over an adjacency matrix, vectorised per pivot row.
+
+    Alongside the distances it tracks the first hop of every shortest path
+    and whether that path sticks to a single mode.
+    """
+    n = len(adj)
+    dist = adj.copy()
+    np.fill_diagonal(dist, 0)
+    next_hop = np.where(adj < UNREACHABLE, np.arange(n, dtype=np.int32)[None, :], -1).astype(np.int32)
+    np.fill_diagonal(next_hop, np.arange(n, dtype=np.int32))
+    mode = adj_mode.copy()
+    np.fill_diagonal(mode, NO_MODE)
+    for k in range(n):
+        via = dist[:, k, None] + dist[None, k, :]
+        better = via < dist
+        if not better.any():
+            continue
+        rows, cols = np.nonzero(better)
+        dist[rows, cols] = via[rows, cols]
+        next_hop[rows, cols] = next_hop[rows, k]
+        first, rest = mode[rows, k], mode[k, cols]
+        mode[rows, cols] = np.where(first == rest, first, MIXED)
+    np.minimum(dist, UNREACHABLE, out=dist)
+    return dist.astype(np.int32), next_hop, mode
+
+
+def _bucketed(
+    df: pd.DataFrame, windows: pd.DataFrame, nodes: List[str], base: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Per-departure-bucket distance layers from time-of-day overrides.
+
+    Bucket boundaries are every window start/end; each bucket's layer is
+    the all-pairs table of the base edges with the windows active at the
+    bucket start overriding matching (from, to, mode) rows.
+    """
+    start = windows["depart_from"].astype(str).str[:5].map(to_slot).clip(0, HORIZON + 1).to_numpy()
+    end = windows["depart_to"].astype(str).str[:5].map(to_slot).clip(0, HORIZON + 1).to_numpy()
+    edges = np.unique(np.concatenate([[0], start, end]))
+    edges = edges[edges <= HORIZON]
+    slot_bucket = (np.searchsorted(edges, np.arange(HORIZON + 1), side="right") - 1).astype(np.int16)
+
+    key = ["loc_from", "loc_to", "mode"]
+    layers = []
+    for e in edges:
+        active = windows[(start <= e) & (end > e)]
+        if active.empty:
+            layers.append(base)
+            continue
+        merged = pd.concat([active[key + ["minutes"]], df[key + ["minutes"]]], ignore_index=True)
+        merged = merged.drop_duplicates(key, keep="first")
+        _, adj, adj_mode = _adjacency(merged, nodes)
+        layers.append(_all_pairs(adj, adj_mode)[0])
+    return np.stack(layers), slot_bucket
+
+
+def _build_graph(df: pd.DataFrame, windows: Optional[pd.DataFrame] = None) -> TravelMatrix:
+    if windows is None or windows.empty:
+        nodes, adj, adj_mode = _adjacency(df)
+        return TravelMatrix(nodes, *_all_pairs(adj, adj_mode))
+    locs = pd.concat([df["loc_from"], df["loc_to"], windows["loc_from"], windows["loc_to"]], ignore_index=True)
+    nodes = [str(u) for u in pd.unique(locs)]
+    _, adj, adj_mode = _adjacency(df, nodes)
+    dist, next_hop, mode = _all_pairs(adj, adj_mode)
+    bucket_dist, slot_bucket = _bucketed(df, windows, nodes, dist)
+    return TravelMatrix(nodes, dist, next_hop, mode, bucket_dist, slot_bucket)
+
+
+
+
+def _normalize_mode(commute_mode: str) -> str:
+    if commute_mode in ("walk", "auto"):
+        return commute_mode
+    return "bus"  # "bus", "transit" and anything unknown
+
+
+def _read_edges(eng, mode: str) -> pd.DataFrame:
+    if mode == "auto":
+        return pd.read_sql(
             text(
                 """
-                SELECT loc_from, loc_to, MIN(minutes) AS minutes
+                SELECT loc_from, loc_to, mode, minutes
                 FROM travel_times
                 WHERE mode IN ('bus','walk')
-                GROUP BY loc_from, loc_to
                 """
             ),
             eng,
         )
-        return _build_graph(df)
-    else:
-        df = pd.read_sql(text("SELECT loc_from, loc_to, minutes FROM travel_times WHERE mode='bus'"), eng)
-        return _build_graph(df)
+    return pd.read_sql(
+        text("SELECT loc_from, loc_to, mode, minutes FROM travel_times WHERE mode=:mode"),
+        eng,
+        params={"mode": mode},
+    )
+
+
+def _read_windows(eng, mode: str) -> Optional[pd.DataFrame]:
+    if not inspect(eng).has_table(WINDOWS_TABLE):
+        return None
+    cols = "loc_from, loc_to, mode, depart_from, depart_to, minutes"
+    if mode == "auto":
+        return pd.read_sql(text(f"SELECT {cols} FROM {WINDOWS_TABLE} WHERE mode IN ('bus','walk')"), eng)
+    return pd.read_sql(
+        text(f"SELECT {cols} FROM {WINDOWS_TABLE} WHERE mode=:mode"),
+        eng,
+        params={"mode": mode},
+    )
+
+
+# Process-wide graph cache, one entry per mode.  Cached graphs are
+# shared between requests and must be treated as read-only.
+_cache: Dict[str, TravelMatrix] = {}
+_cache_lock = threading.Lock()
+_generation = 0
+
+
+_version_checked: Tuple[float, str] = (0.0, "")
+
+
+def travel_version() -> str:
+    """Cheap fingerprint of ``travel_times``.
+
+    One aggregate query instead of a full read; it changes whenever rows
+    are added, removed or re-timed, and on :func:`invalidate_travel_cache`.
+    The (small) time-window table is hashed row by row instead, so moving
+    a window's bounds, mode or endpoints is picked up as well.
+    The result is reused for ``TRAVEL_VERSION_TTL`` seconds so hot
+    endpoints do not hit the table on every request.
+    """
+    global _version_checked
+    checked_at, version = _version_checked
+    now = time.monotonic()
+    if version and now - checked_at < settings.TRAVEL_VERSION_TTL:
+        return version
+    with get_engine().connect() as conn:
+        count, total, longest = conn.execute(
+            text("SELECT COUNT(*), COALESCE(SUM(minutes), 0), COALESCE(MAX(minutes), 0) FROM travel_times")
+        ).one()
+        version = f"{_generation}-{count}-{total}-{longest}"
+        if inspect(conn).has_table(WINDOWS_TABLE):
+            rows = conn.execute(
+                text(
+                    f"SELECT loc_from, loc_to, mode, depart_from, depart_to, minutes FROM {WINDOWS_TABLE} "
+                    "ORDER BY loc_from, loc_to, mode, depart_from, depart_to, minutes"
+                )
+            ).all()
+            digest = hashlib.sha1(repr([tuple(r) for r in rows]).encode("utf-8")).hexdigest()[:12]
+            version += f"-{len(rows)}-{digest}"
+    _version_checked = (now, version)
+    return version
+
+
+def invalidate_travel_cache() -> None:
+    """Drop every cached graph (and mapped snapshot), forcing the next load
+    to hit the database or re-map the snapshot."""
+    global _generation, _version_checked
+    with _cache_lock:
+        _cache.clear()
+        _snapshots.clear()
+        _generation += 1
+        _version_checked = (0.0, "")
+
+
+# ---- Memory-mapped snapshots ----
+#
+# ``export_travel_snapshot`` writes every mode's arrays as ``.npy`` files
+# plus an ``index.json`` holding the location lists.  Array files carry the
+# travel version in their name and ``index.json`` is swapped in last, so a
+# worker mapping the directory never mixes two exports.  Workers map the
+# arrays read-only, which lets the OS share one physical copy between them,
+# and re-map once ``index.json`` is replaced (checked with one ``stat`` per
+# load), so an export reaches every worker, not just the one serving it.
+
+SNAPSHOT_MODES = ("bus", "walk", "auto")
+SNAPSHOT_INDEX = "index.json"
+
+_snapshots: Dict[str, TravelMatrix] = {}
+_snapshot_stamp: Optional[Tuple[int, int, int]] = None
+
+
+def _index_stamp(directory: str) -> Optional[Tuple[int, int, int]]:
+    try:
+        st = os.stat(os.path.join(directory, SNAPSHOT_INDEX))
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
 
+def _snapshot_file(directory: str, mode: str, name: str, version: str) -> str:
+    return os.path.join(directory, f"{mode}.{name}.{version}.npy")
 
 
+def export_travel_snapshot(directory: str) -> str:
+    """Resolve every commute mode from the database and write it to
+    ``directory``.  Returns the exported travel version."""
+    os.makedirs(directory, exist_ok=True)
+    eng = get_engine()
+    version = travel_version()
+    modes: Dict[str, List[str]] = {}
+    written = set()
+    for mode in SNAPSHOT_MODES:
+        G = _build_graph(_read_edges(eng, mode), _read_windows(eng, mode))
+        for name in TravelMatrix.ARRAYS:
+            # never rewrite a file in place: other workers may have it mapped
+            path = _snapshot_file(directory, mode, name, version)
+            with open(path + ".tmp", "wb") as f:
+                np.save(f, np.ascontiguousarray(getattr(G, name)))
+            os.replace(path + ".tmp", path)
+            written.add(os.path.basename(path))
+        modes[mode] = G.nodes
+    tmp = os.path.join(directory, SNAPSHOT_INDEX + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"version": version, "modes": modes}, f, ensure_ascii=False)
+    os.replace(tmp, os.path.join(directory, SNAPSHOT_INDEX))
+    # drop arrays of earlier exports; workers still mapping one keep it
+    # alive until they re-map
+    for fn in os.listdir(directory):
+        if fn.endswith(".npy") and fn.split(".", 1)[0] in SNAPSHOT_MODES and fn not in written:
+            os.remove(os.path.join(directory, fn))
+    return version
 
-def travel_slots(G: nx.DiGraph, a: str, b: str) -> int:
-    if a == b:
-        return 0
+
+def _load_snapshot(directory: str, mode: str) -> Optional[TravelMatrix]:
+    try:
+        with open(os.path.join(directory, SNAPSHOT_INDEX), encoding="utf-8") as f:
+            meta = json.load(f)
+    except FileNotFoundError:
+        return None
+    nodes = meta["modes"].get(mode)
+    if nodes is None:
+        return None
+    version = meta["version"]
     try:
-        return nx.dijkstra_path_length(G, a, b, weight="slots")
-    except Exception:
-        return 9999
\ No newline at end of file
+        arrays = {
+            name: np.load(_snapshot_file(directory, mode, name, version), mmap_mode="r")
+            for name in TravelMatrix.ARRAYS
+        }
+    except FileNotFoundError as e:
+        # an export from an older build without every array; use the DB
+        print(f"[TRAVEL] incomplete snapshot for {mode}: {e.filename}")  # << LOG
+        return None
+    return TravelMatrix(nodes, version=version, commute=mode, **arrays)
+
+
+def load_travel_graph(commute_mode: str = "bus") -> TravelMatrix:
+    global _snapshot_stamp
+    mode = _normalize_mode(commute_mode)
+    if settings.TRAVEL_SNAPSHOT_DIR:
+        stamp = _index_stamp(settings.TRAVEL_SNAPSHOT_DIR)
+        with _cache_lock:
+            if stamp != _snapshot_stamp:
+                _snapshots.clear()
+                _snapshot_stamp = stamp
+            snap = _snapshots.get(mode)
+            if snap is None:
+                snap = _load_snapshot(settings.TRAVEL_SNAPSHOT_DIR, mode)
+                if snap is not None:
+                    _snapshots[mode] = snap
+        if snap is not None:
+            return snap
+    version = travel_version()
+    with _cache_lock:
+        hit = _cache.get(mode)
+        if hit is not None and hit.version == version:
+            return hit
+        eng = get_engine()
+        G = _build_graph(_read_edges(eng, mode), _read_windows(eng, mode))
+        G.version = version
+        G.commute = mode
+        _cache[mode] = G
+        return G
+
+
+
+
+def travel_slots(G: TravelMatrix, a: str, b: str, depart: Optional[int] = None) -> int:
+    """Travel slots from ``a`` to ``b``; pass the departure slot to pick up
+    time-of-day costs."""
+    if depart is None:
+        return G.slots(a, b)
+    return G.slots_at(a, b, depart)
+
+
+def travel_tables(G: TravelMatrix, locs: List[str]) -> np.ndarray:
+    """Travel slots between ``locs`` as a ``[from, to, departure slot]`` array."""
+    return G.departure_tables(locs)
+
+
+def eta_matrix(G: TravelMatrix, locs: List[str]) -> Dict[str, object]:
+    """All-pairs slots/minutes between ``locs`` (``slots[i][j]`` is from
+    ``locs[i]`` to ``locs[j]``); unreachable pairs get ``None`` minutes."""
+    slots = G.sub_matrix(locs)
+    minutes = [
+        [int(v) * SLOT_MIN if v < UNREACHABLE else None for v in row]
+        for row in slots
+    ]
+    return {"locations": list(locs), "slots": slots.tolist(), "minutes": minutes}
+
+
+def route_legs(G: TravelMatrix, locs: List[str]) -> List[Dict[str, object]]:
+    """Route of every consecutive pair in ``locs`` (e.g. the locations of a
+    solved schedule in start order), read straight from the matrix."""
+    legs: List[Dict[str, object]] = []
+    for a, b in zip(locs, locs[1:]):
+        slots = G.slots(a, b)
+        legs.append(
+            {
+                "from": a,
+                "to": b,
+                "slots": slots,
+                "minutes": slots * SLOT_MIN if slots < UNREACHABLE else None,
+                "mode": G.leg_mode(a, b),
+                "stops": G.path(a, b),
+            }
+        )
+    return legs
@@ -0,0 +1,79 @@
+"""CP-SAT sequencing formulations against task count.
+
+Run from ``SystemCode/BackEnd``::
+
+    python -m benchmarks.bench_cp_models
+
+Builds random 20/50/100-task days on a synthetic campus and, for the
+``"pairwise"`` and ``"circuit"`` formulations of
+:func:`app.services.scheduler._build_cp_model`, reports model build time,
+solve status within the 5 s limit used by ``solve_plan``, and the tasks,
+priority and travel of the schedule found.
+"""
+import random
+import time
+
+from ortools.sat.python import cp_model
+
+from app.schemas.tasks import TaskIn
+from app.services.scheduler import _build_cp_model
+from app.services.travel_graph import _build_graph
+from benchmarks.bench_travel_graph import synthetic_edges
+
+TIME_LIMIT = 5.0
+
+
+def synthetic_tasks(n: int, locs, seed: int = 0):
+    rng = random.Random(seed)
+    tasks = []
+    for i in range(n):
+        earliest = rng.randint(8 * 60, 19 * 60)
+        latest = min(21 * 60, earliest + rng.randint(60, 300))
+        tasks.append(TaskIn(
+            id=f"t{i}",
+            title=f"Task {i}",
+            location=rng.choice(locs),
+            earliest=f"{earliest // 60:02d}:{earliest % 60:02d}",
+            latest=f"{latest // 60:02d}:{latest % 60:02d}",
+            duration_min=rng.choice([30, 45, 60, 90]),
+            priority=rng.randint(1, 5),
+        ))
+    return tasks
+
+
+def run(G, tasks, formulation: str):
+    t0 = time.perf_counter()
+    model, starts, ends, pres, objectives = _build_cp_model(G, tasks, formulation)
+    model.Minimize(objectives["travel"])
+    t1 = time.perf_counter()
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = TIME_LIMIT
+    status = solver.Solve(model)
+    t2 = time.perf_counter()
+
+    placed, priority, travel = 0, 0, 0
+    if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        chosen = sorted(
+            (solver.Value(starts[t.id]), solver.Value(ends[t.id]), t) for t in tasks if solver.Value(pres[t.id])
+        )
+        placed = len(chosen)
+        priority = sum(t.priority for _, _, t in chosen)
+        travel = sum(G.slots(a[2].location, b[2].location) for a, b in zip(chosen, chosen[1:]))
+    return (t1 - t0) * 1000, t2 - t1, solver.StatusName(status), placed, priority, travel
+
+
+def main() -> None:
+    G = _build_graph(synthetic_edges(30, density=0.3))
+    print(f"{'tasks':>6} {'model':>9} {'build ms':>9} {'solve s':>8} {'status':>9} {'placed':>7} {'priority':>9} {'travel':>7}")
+    for n in (20, 50, 100):
+        tasks = synthetic_tasks(n, G.nodes, seed=n)
+        for formulation in ("pairwise", "circuit"):
+            build_ms, solve_s, status, placed, priority, travel = run(G, tasks, formulation)
+            print(
+                f"{n:>6} {formulation:>9} {build_ms:>9.1f} {solve_s:>8.2f} {status:>9} "
+                f"{placed:>7} {priority:>9} {travel:>7}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""Travel graph build time against edge count.
+
+Run from ``SystemCode/BackEnd``::
+
+    python -m benchmarks.bench_travel_graph
+
+Builds synthetic ``travel_times`` frames of increasing size and times the
+two stages of :func:`app.services.travel_graph._build_graph`: the
+column-wise adjacency build and the all-pairs shortest-path pass.
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.services.travel_graph import _adjacency, _all_pairs
+
+
+def synthetic_edges(n_locs: int, density: float, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    src, dst = np.nonzero(rng.random((n_locs, n_locs)) < density)
+    keep = src != dst
+    src, dst = src[keep], dst[keep]
+    names = np.array([f"LOC{i:04d}" for i in range(n_locs)])
+    return pd.DataFrame({
+        "loc_from": names[src],
+        "loc_to": names[dst],
+        "mode": rng.choice(["walk", "bus"], size=len(src)),
+        "minutes": rng.integers(2, 40, size=len(src)),
+    })
+
+
+def main() -> None:
+    print(f"{'locations':>10} {'edges':>10} {'adjacency ms':>14} {'all-pairs ms':>14}")
+    for n_locs in (25, 50, 100, 200, 400):
+        df = synthetic_edges(n_locs, density=0.3)
+        t0 = time.perf_counter()
+        _, adj, adj_mode = _adjacency(df)
+        t1 = time.perf_counter()
+        _all_pairs(adj, adj_mode)
+        t2 = time.perf_counter()
+        print(f"{n_locs:>10} {len(df):>10} {(t1 - t0) * 1000:>14.1f} {(t2 - t1) * 1000:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
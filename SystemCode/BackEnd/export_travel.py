@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+import argparse
+import sys
+
+from app.core.config import settings
+from app.services.travel_graph import export_travel_snapshot
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Export resolved travel matrices to a memory-mapped snapshot.")
+    ap.add_argument("directory", nargs="?", default=settings.TRAVEL_SNAPSHOT_DIR,
+                    help="Snapshot directory (defaults to TRAVEL_SNAPSHOT_DIR)")
+    args = ap.parse_args()
+    if not args.directory:
+        ap.error("no directory given and TRAVEL_SNAPSHOT_DIR is not set")
+    version = export_travel_snapshot(args.directory)
+    print(f"Exported travel snapshot {version} to {args.directory}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())